@@ -1,390 +1,287 @@
 import streamlit as st
 import requests
+import json
+import logging
+import time
 import pandas as pd
-from datetime import datetime, timedelta
 import pytz # Library for timezone handling
-from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor # For parallel API calls
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait
+from availability import core
+from availability.client import CONNECT_TIMEOUT_SECONDS
+from availability.core import WORKING_DAYS_TO_CHECK, get_next_working_days
+from availability.deadline import Deadline, deadline_scope, submit
+from availability.discovery import list_organization_memberships, list_solo_event_types, stream_discovery_rows
+from availability.events import PUSHED_RECONCILE_INTERVAL_SECONDS, RECONCILE_INTERVAL_SECONDS
+from availability.metrics import LATENCY_BUCKET_LABELS, METRICS, instrumented_cache
+from availability.refresher import Snapshot, SnapshotRefresher
+from availability.singleflight import coalesced
+from availability.reports import build_admin_tables, build_slot_index, build_utilization_index
+from availability.slot_table import SlotTable
+from availability.snapshots import SnapshotRegistry
+from availability.store import get_store, persisted
+from availability.teams import load_registry
+from availability.webhooks import WEBHOOK_HOST, WEBHOOK_PORT, WebhookServer
 
 # --- CONFIGURATION ---
-# --- APAC TEAM DATA ---
-TEAM_DATA = [
-    {
-        "name": "Anthony Ferlazzo",
-        "userUri": "https://api.calendly.com/users/HCHECMCAGLZOSHN7",
-        "soloEventUri": "https://api.calendly.com/event_types/GDEDPXPOOJEF32SR",
-        "languages": ["English"],
-        "team": "APAC",
-        "active": True
-    },
-    {
-        "name": "Gem Rooke",
-        "userUri": "https://api.calendly.com/users/bfc287f8-5679-44c2-92bf-878d73a5a34d",
-        "soloEventUri": "https://api.calendly.com/event_types/e8674269-3543-4d7a-9f86-df9e803ba3b6",
-        "languages": ["English"],
-        "team": "APAC",
-        "active": True
-    },
-    {
-        "name": "CP Kelleyen",
-        "userUri": "https://api.calendly.com/users/ec1f3b31-8a31-4359-84f2-e0f8b6793b41",
-        "soloEventUri": "https://api.calendly.com/event_types/8973b256-0761-4f8e-b250-7bced9ab0647",
-        "languages": ["English"],
-        "team": "APAC",
-        "active": True
-    },
-    {
-        "name": "Lip Rad",
-        "userUri": "https://api.calendly.com/users/EFHAAIGCGF6Q6R3D",
-        "soloEventUri": "https://api.calendly.com/event_types/FCACKUDXCA4M4DJ5",
-        "languages": ["English"],
-        "team": "APAC",
-        "active": True
-    },
-]
+# Teams, members, languages and timezone options live in teams.json (or TEAMS_CONFIG_PATH)
+# Fetching, slot counting and the admin tables live in the Streamlit-free availability
+# package (see availability.core, availability.reports and the availability.cli batch job)
 
 # --- CONSTANTS (Copied from EMEA logic) ---
-WORKING_DAYS_TO_CHECK = 10 
-MINIMUM_NOTICE_HOURS = 21
-SLOT_DURATION_MINUTES = 120
 ADMIN_PASSWORD = "WinAsOne" # Kept from EMEA
 DEV_PASSWORD = "WinAsOneDev" # Kept from EMEA
 WORKING_HOURS_START = 9
 WORKING_HOURS_END = 17
-
-# --- APAC LANGUAGE & TIMEZONE CONFIG ---
-LANGUAGES = ["English"] # Only English
-TIMEZONE_OPTIONS = {
-    "UTC+7 (Bangkok)": "Asia/Bangkok",
-    "UTC+8 (Singapore/Manila/Perth)": "Asia/Singapore",
-    "UTC+9:30 (Darwin)": "Australia/Darwin",
-    "UTC+10 (Melbourne/Sydney/Brisbane)": "Australia/Melbourne",
-    "UTC+12 (Auckland)": "Pacific/Auckland",
-}
-DEFAULT_TIMEZONE_FRIENDLY = "UTC+10 (Melbourne/Sydney/Brisbane)"
+REFRESH_INTERVAL_SECONDS = 600 # Matches the availability cache TTL
+SNAPSHOT_STORE_TTL_SECONDS = 3600 # How old a persisted snapshot may be and still warm a restart
+DISCOVERY_USER_TTL_SECONDS = 86400 # Per-member event types; also invalidated when the membership changes
+DISCOVERY_REPORT_TTL_SECONDS = 3600 # How long every session reuses a published organization discovery report
+INSTRUMENTATION_REFRESH_SECONDS = 10
+PAGE_DEADLINE_SECONDS = 45 # Budget for one snapshot fetch or dev-tools report; slower specialists are marked incomplete
 
 # --- GLOBAL HELPERS ---
-def format_to_iso_z(dt):
-    """Formats a datetime object to the ISO Z format Calendly expects."""
-    return dt.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
-
-@st.cache_data
+@instrumented_cache(st.cache_data)
 def convert_df_to_csv(df):
     """Converts a DataFrame to a CSV string for downloading."""
     return df.to_csv(index=True).encode('utf-8')
 
 # --- CORE FUNCTIONS ---
 
-def get_filtered_team_members():
-    """Filters the hardcoded TEAM_DATA list for active APAC members."""
-    # Modified from EMEA: No TEAM_TO_REPORT filter needed
-    return [
-        m for m in TEAM_DATA
-        if m["active"] and m["userUri"] and m["soloEventUri"]
-    ]
+@instrumented_cache(st.cache_resource)
+def get_team_registry():
+    """Loads the configured teams once per process."""
+    return load_registry()
 
-@st.cache_data(ttl=600)
-def get_user_availability(solo_event_uri, start_date, end_date, api_key):
-    """Fetches available slots from the Calendly API for a single user."""
-    if not api_key: return []
+def get_filtered_team_members(team_name):
+    """Returns the active members of one configured team."""
+    return get_team_registry().active_members(team_name)
 
-    headers = {'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'}
-    all_slots = []
-    base_url = "https://api.calendly.com/event_type_available_times"
-    
-    loop_start_date = start_date
-    while loop_start_date < end_date:
-        loop_end_date = loop_start_date + timedelta(days=7)
-        if loop_end_date > end_date: loop_end_date = end_date
-
-        params = {
-            'event_type': solo_event_uri,
-            'start_time': format_to_iso_z(loop_start_date),
-            'end_time': format_to_iso_z(loop_end_date)
-        }
-        try:
-            response = requests.get(base_url, headers=headers, params=params)
-            response.raise_for_status()
-            data = response.json()
-            for slot in data.get("collection", []):
-                if slot.get("status") == "available":
-                    start_time_str = slot["start_time"].replace('Z', '+00:00')
-                    all_slots.append(datetime.fromisoformat(start_time_str))
-        except requests.exceptions.HTTPError: 
-            pass 
-        loop_start_date += timedelta(days=7)
-    return all_slots
-
-@st.cache_data(ttl=3600) 
+def show_api_error(message):
+    """Surfaces a core API error message in the page."""
+    st.error(message, icon="🚨")
+
+@coalesced("get_organization_uri")
+@instrumented_cache(st.cache_data(ttl=3600))
 def get_organization_uri(api_key):
     """Fetches the organization URI associated with the API key."""
-    headers = {'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'}
-    url = "https://api.calendly.com/users/me"
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json().get("resource", {}).get("current_organization")
-    except requests.exceptions.HTTPError as e:
-        if e.response.status_code == 401:
-             st.error("Invalid API Key. Please check your Streamlit secrets.", icon="🚨")
-        else:
-             st.error(f"Calendly API Error (User): {e.response.json().get('message', 'Unknown Error')}", icon="🚨")
-        return None
+    return core.get_organization_uri(api_key, on_error=show_api_error)
+
+def get_snapshot_timezones():
+    """Every timezone any team offers: the snapshot only covers their working days."""
+    return [pytz.timezone(name) for name in get_team_registry().timezone_names()]
 
-@st.cache_data(ttl=600)
-def fetch_all_scheduled_events(organization_uri, start_date, end_date, api_key):
+def webhooks_enabled():
+    """True when the webhook receiver is configured to start (see get_webhook_server)."""
+    return bool(WEBHOOK_PORT and st.secrets.get("CALENDLY_WEBHOOK_SIGNING_KEY"))
+
+def fetch_all_team_availability(team_members, api_key, on_specialist=None, reconcile_interval_seconds=None):
     """
-    Fetches all booked appointments for an entire organization and
-    returns a count of long events per user URI.
+    Fetches availability AND all scheduled events for the given members through
+    the app's availability cache within PAGE_DEADLINE_SECONDS. Runs on the
+    refresher thread, so errors are logged.
     """
-    counts_by_user_uri = defaultdict(int)
-    if not api_key or not organization_uri: 
-        return counts_by_user_uri
+    return core.fetch_all_team_availability(
+        team_members, api_key, fetch_window=core.get_availability_window, on_specialist=on_specialist,
+        deadline_seconds=PAGE_DEADLINE_SECONDS, timezones=get_snapshot_timezones(),
+        reconcile_interval_seconds=reconcile_interval_seconds,
+    )
 
-    headers = {'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'}
-    base_url = "https://api.calendly.com/scheduled_events"
-    
-    params = {
-        'organization': organization_uri,
-        'min_start_time': format_to_iso_z(start_date),
-        'max_start_time': format_to_iso_z(end_date),
-        'count': 100,
-        'status': 'active' 
-    }
-    
-    while base_url:
-        try:
-            response = requests.get(base_url, headers=headers, params=params)
-            response.raise_for_status() 
-            data = response.json()
-            
-            for event in data.get("collection", []):
-                try:
-                    start_str = event['start_time'].replace('Z', '+00:00')
-                    end_str = event['end_time'].replace('Z', '+00:00')
-                    start_time = datetime.fromisoformat(start_str)
-                    end_time = datetime.fromisoformat(end_str)
-                    duration_minutes = (end_time - start_time).total_seconds() / 60
-                    
-                    if duration_minutes >= 60:
-                        user_uri = event.get("event_memberships", [{}])[0].get("user")
-                        if user_uri:
-                            counts_by_user_uri[user_uri] += 1
-                except Exception:
-                    pass 
-
-            base_url = data.get("pagination", {}).get("next_page")
-            params = {} 
-            
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 403:
-                 st.error("API Key Error: This key does not have Organization-level permission to read scheduled events for all users. Please use an Admin-generated token.", icon="🚨")
-            else:
-                 st.error(f"Calendly API Error (Events): {e.response.json().get('message', 'Unknown Error')}", icon="🚨")
-            base_url = None 
-        except Exception as e:
-            st.error(f"A non-HTTP error occurred: {e}", icon="🚨")
-            base_url = None
-            
-    return counts_by_user_uri
-
-def fetch_language_availability(team_members, api_key, selected_language):
-    """Fetches availability for a single language using concurrent API calls for speed."""
-    utc, now = pytz.UTC, datetime.now(pytz.UTC)
-    minimum_booking_time = now + timedelta(hours=MINIMUM_NOTICE_HOURS)
-    api_start_date = now + timedelta(minutes=1)
-    api_end_date = api_start_date + timedelta(days=WORKING_DAYS_TO_CHECK + 4) 
-
-    language_slots = []
-    # Filter for language (will just be English, but keeps logic identical)
-    members_for_lang = [m for m in team_members if selected_language in m["languages"]]
-    
-    with ThreadPoolExecutor(max_workers=len(members_for_lang) or 1) as executor:
-        args = [(m["soloEventUri"], api_start_date, api_end_date, api_key) for m in members_for_lang]
-        results = executor.map(lambda p: get_user_availability(*p), args)
-        for member, user_slots in zip(members_for_lang, results):
-            for slot_time in user_slots:
-                if slot_time >= minimum_booking_time:
-                    language_slots.append({"specialist": member["name"], "dateTime": slot_time})
-    language_slots.sort(key=lambda x: x["dateTime"])
-    return language_slots
-
-def fetch_all_team_availability(team_members, api_key):
+@instrumented_cache(st.cache_resource)
+def get_arrived_availability(api_key):
     """
-    Fetches availability (concurrently) AND all scheduled events (one big call) 
-    for all team members.
+    {specialist: bookable slot epochs} published by the in-flight snapshot fetch as each
+    member's availability arrives, so a cold start can paint before it completes.
     """
-    utc, now = pytz.UTC, datetime.now(pytz.UTC)
-    
-    min_availability_time = now + timedelta(hours=MINIMUM_NOTICE_HOURS)
-    api_availability_start = now + timedelta(minutes=1)
-    api_availability_end = api_availability_start + timedelta(days=WORKING_DAYS_TO_CHECK + 4)
-    
-    api_scheduled_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    api_scheduled_end = api_scheduled_start + timedelta(days=WORKING_DAYS_TO_CHECK + 4) 
-    
-    availability_by_specialist = defaultdict(list)
-    raw_slots_for_summary = []
-    booked_event_counts = {} 
-
-    with ThreadPoolExecutor(max_workers=len(team_members) or 1) as executor:
-        args = [(m, api_key) for m in team_members]
-        def fetch_availability(member, key):
-            available_slots = get_user_availability(
-                member["soloEventUri"], api_availability_start, api_availability_end, key
-            )
-            return member, available_slots
-        results = executor.map(lambda p: fetch_availability(*p), args)
-        for member, user_slots in results:
-            for slot_time in user_slots:
-                if slot_time >= min_availability_time:
-                    availability_by_specialist[member["name"]].append(slot_time)
-                    raw_slots_for_summary.append({"specialist_info": member, "dateTime": slot_time})
-    
-    organization_uri = get_organization_uri(api_key)
-    if organization_uri:
-        counts_by_user_uri = fetch_all_scheduled_events(
-            organization_uri, api_scheduled_start, api_scheduled_end, api_key
+    return {}
+
+# The builders below run once per snapshot version (see get_snapshot_index) and
+# are shared by every session; they go away with the version.
+def build_team_slot_index(team_data, team_name, timezone_name, working_days):
+    """
+    Builds the SlotIndex shared by every view for one (team, timezone). The
+    snapshot covers every team; this projects it onto one team's members and
+    applies the MINIMUM_NOTICE_HOURS cut-off, after the cache read.
+    """
+    with METRICS.timer("build.slot_index"):
+        return build_slot_index(
+            team_data.availability_by_specialist, get_filtered_team_members(team_name), pytz.timezone(timezone_name), working_days
         )
-        user_uri_to_name = {m['userUri']: m['name'] for m in team_members}
-        for uri, count in counts_by_user_uri.items():
-            if uri in user_uri_to_name:
-                name = user_uri_to_name[uri]
-                booked_event_counts[name] = count
 
-    return availability_by_specialist, raw_slots_for_summary, booked_event_counts
+def build_team_utilization_index(team_data, team_name):
+    """
+    Builds the interval UtilizationIndex for one team. It is timezone-independent,
+    so switching timezone only re-runs the range queries.
+    """
+    with METRICS.timer("build.utilization_index"):
+        return build_utilization_index(team_data, get_filtered_team_members(team_name))
+
+def build_team_admin_report(utilization, team_name, timezone_name, working_days):
+    """
+    Builds the admin tables and their CSV bytes once per (team, timezone,
+    working days), so an admin-page rerun (any widget interaction) only
+    renders instead of rebuilding and re-hashing the DataFrames.
+    """
+    with METRICS.timer("build.admin_tables"):
+        tables = build_admin_tables(
+            utilization, get_filtered_team_members(team_name), get_team_registry().team(team_name).languages,
+            pytz.timezone(timezone_name), working_days,
+        )
+        csv_bytes = {name: df.to_csv(index=True).encode('utf-8') for name, df in tables._asdict().items()}
+    return tables, csv_bytes
+
+@instrumented_cache(st.cache_resource)
+def get_team_refresher(api_key):
+    """
+    Starts (once per process) the background refresher for the availability
+    snapshot of every configured team, warmed from the on-disk store if a
+    recent snapshot exists. Members shared by several teams are fetched once,
+    and the org-wide scheduled-events scan runs once for all teams.
+    """
+    arrived = get_arrived_availability(api_key)
+    # Pushed bookings keep the synced range current, so most refreshes can sync incrementally
+    reconcile_interval = PUSHED_RECONCILE_INTERVAL_SECONDS if webhooks_enabled() else RECONCILE_INTERVAL_SECONDS
+
+    def fetch_snapshot():
+        arrived.clear()
+        return fetch_all_team_availability(
+            get_team_registry().all_active_members(), api_key, on_specialist=arrived.__setitem__,
+            reconcile_interval_seconds=reconcile_interval,
+        )
+
+    refresher = SnapshotRefresher(
+        fetch_snapshot,
+        REFRESH_INTERVAL_SECONDS,
+        name="all-teams",
+        store=get_store(),
+        store_ttl_seconds=SNAPSHOT_STORE_TTL_SECONDS,
+        # Snapshots persisted in an older data format are refetched
+        validate=lambda data: isinstance(data, core.TeamData) and isinstance(data.availability_by_specialist, SlotTable),
+    )
+    return refresher.start()
+
+@instrumented_cache(st.cache_resource)
+def get_webhook_server(api_key):
+    """
+    Starts (once per process, when CALENDLY_WEBHOOK_PORT is set) the Calendly
+    webhook receiver. Each invitee.created / invitee.canceled delivery patches
+    the shared snapshot for just the host's booked count and affected windows,
+    instead of waiting for the next refresh. Not started without
+    CALENDLY_WEBHOOK_SIGNING_KEY, since unsigned deliveries could be forged.
+    """
+    signing_key = st.secrets.get("CALENDLY_WEBHOOK_SIGNING_KEY")
+    if not WEBHOOK_PORT or not api_key:
+        return None
+    if not webhooks_enabled():
+        logging.getLogger(__name__).warning("CALENDLY_WEBHOOK_PORT is set but CALENDLY_WEBHOOK_SIGNING_KEY is not; webhooks disabled")
+        return None
+    refresher = get_team_refresher(api_key)
+
+    def refetch_window(solo_event_uri, window_start, window_end, api_key):
+        # Drop the cached window so it is fetched fresh from Calendly
+        core.get_availability_window.invalidate(solo_event_uri, window_start, window_end, api_key)
+        return core.get_availability_window(solo_event_uri, window_start, window_end, api_key)
+
+    def on_event(name, scheduled_event):
+        refresher.patch(lambda data: core.apply_booking_change(
+            data, scheduled_event, get_team_registry().all_active_members(), api_key, fetch_window=refetch_window,
+            timezones=get_snapshot_timezones(),
+        ))
+
+    server = WebhookServer(on_event, signing_key=signing_key, host=WEBHOOK_HOST, port=WEBHOOK_PORT)
+    return server.start()
 
 # --- Function for Organization Discovery (from EMEA) ---
-@st.cache_data(ttl=3600) # Cache for 1 hour
-def fetch_organization_discovery_report(organization_uri, api_key):
-    """Fetches all users and their event types for an entire organization."""
+# Called from discovery worker threads, which have no Streamlit script context, so it
+# is cached (and coalesced) by the store alone
+@persisted("member_event_types", ttl_seconds=DISCOVERY_USER_TTL_SECONDS)
+def fetch_member_event_types(user_uri, membership_updated_at, api_key):
+    """
+    Fetches one member's solo event types for the discovery report. Keyed on the
+    membership's updated_at, so a rerun only refetches members that changed.
+    """
+    return list_solo_event_types(user_uri, api_key)
+
+def stream_organization_discovery_report(organization_uri, api_key):
+    """Yields (users_done, users_total, rows) as each member's event types arrive."""
     if not api_key or not organization_uri:
-        return []
-    
-    headers = {'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'}
-    all_user_event_data = []
+        return
+    try:
+        memberships = list_organization_memberships(organization_uri, api_key)
+    except requests.exceptions.HTTPError as e:
+        st.error(f"Failed to fetch organization users: {e.response.json().get('message')}", icon="🚨")
+        return
+    except requests.exceptions.RequestException as e:
+        st.error(f"Failed to fetch organization users: {e}", icon="🚨")
+        return
+    yield from stream_discovery_rows(memberships, fetch_member_event_types, api_key)
+
+@instrumented_cache(st.cache_resource)
+def get_discovery_registry(organization_uri):
+    """
+    Process-wide versions of one organization's discovery report, as a Snapshot
+    of the DataFrame and its scan time; sessions hold a SnapshotRef, not the DataFrame.
+    """
+    return SnapshotRegistry("org_discovery")
 
-    # 1. Get all users in the organization
-    users_url = f"https://api.calendly.com/organization_memberships?organization={organization_uri}&count=100"
-    all_users = []
-    
-    while users_url:
-        try:
-            response = requests.get(users_url, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-            all_users.extend(data.get("collection", []))
-            users_url = data.get("pagination", {}).get("next_page")
-        except requests.exceptions.HTTPError as e:
-            st.error(f"Failed to fetch organization users: {e.response.json().get('message')}", icon="🚨")
-            users_url = None
-    
-    # 2. For each user, get their event types
-    for user_membership in all_users:
-        user = user_membership.get("user", {})
-        user_name = user.get("name")
-        user_email = user.get("email")
-        user_uri = user.get("uri")
-        
-        if not user_uri:
-            continue
-
-        events_url = f"https://api.calendly.com/event_types?user={user_uri}&count=50"
-        
-        while events_url:
-            try:
-                response = requests.get(events_url, headers=headers)
-                response.raise_for_status()
-                data = response.json()
-                
-                for event in data.get("collection", []):
-                    # Only include solo events
-                    if event.get("kind") == "solo":
-                        all_user_event_data.append({
-                            "User Name": user_name,
-                            "User Email": user_email,
-                            "User URI": user_uri,
-                            "Event Type Name": event.get("name"),
-                            "Event Type URI": event.get("uri"),
-                            "Event Active": event.get("active", False)
-                        })
-                
-                events_url = data.get("pagination", {}).get("next_page")
-            except requests.exceptions.HTTPError:
-                events_url = None # Silently fail for one user's events
-
-    return all_user_event_data
+def acquire_fresh_org_report(registry):
+    """A SnapshotRef to the organization's published report if it is recent enough to share, else None."""
+    try:
+        ref = registry.acquire()
+    except KeyError:
+        return None # Nothing published yet
+    if (datetime.now(pytz.UTC) - ref.value.fetched_at).total_seconds() > DISCOVERY_REPORT_TTL_SECONDS:
+        ref.release()
+        return None
+    return ref
+
+def hold_org_report(ref):
+    """Makes `ref` this session's discovery report (None clears it), releasing the report it held before."""
+    previous = st.session_state['org_report_ref']
+    st.session_state['org_report_ref'] = ref
+    if previous is not None:
+        previous.release()
+
+def to_discovery_report_df(rows):
+    """Builds the discovery report table in a stable order, whatever order the rows arrived in."""
+    return pd.DataFrame(rows).sort_values(["User Name", "Event Type Name"], na_position="last", ignore_index=True)
 
 # --- NEW: Function for Single User Event Discovery ---
-@st.cache_data(ttl=60) # Cache for 1 minute
+@coalesced("fetch_user_event_types")
+@instrumented_cache(st.cache_data(ttl=60)) # Cache for 1 minute
+@persisted("user_event_types", ttl_seconds=60)
 def fetch_user_event_types(user_uri, api_key):
     """Fetches all 'solo' event types for a single user URI."""
     if not api_key or not user_uri:
         return []
-    
-    headers = {'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'}
-    events_url = f"https://api.calendly.com/event_types?user={user_uri}&count=50"
-    user_events = []
-    
-    while events_url:
-        try:
-            response = requests.get(events_url, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-            
-            for event in data.get("collection", []):
-                # Only include solo events
-                if event.get("kind") == "solo":
-                    user_events.append({
-                        "Event Type Name": event.get("name"),
-                        "Event Type URI": event.get("uri"),
-                        "Event Active": event.get("active", False)
-                    })
-            
-            events_url = data.get("pagination", {}).get("next_page")
-        except requests.exceptions.HTTPError as e:
-            st.error(f"Failed to fetch events for user: {e.response.json().get('message')}", icon="🚨")
-            events_url = None # Stop on error
-
-    return user_events
-
-def calculate_true_slots(date_times):
-    """Calculates non-overlapping slots."""
-    if not date_times: return 0
-    date_times.sort()
-    slot_duration = timedelta(minutes=SLOT_DURATION_MINUTES)
-    count = 0
-    last_booked_end_time = datetime.min.replace(tzinfo=pytz.UTC)
-    for start_time in date_times:
-        if start_time >= last_booked_end_time:
-            count += 1
-            last_booked_end_time = start_time + slot_duration
-    return count
-
-def get_next_working_days(n, timezone):
-    """Gets the next N working days."""
-    days = []
-    current_day = datetime.now(timezone).date()
-    while len(days) < n:
-        if current_day.weekday() < 5:
-            days.append(current_day)
-        current_day += timedelta(days=1)
-    return days
+    try:
+        return list_solo_event_types(user_uri, api_key)
+    except requests.exceptions.HTTPError as e:
+        st.error(f"Failed to fetch events for user: {e.response.json().get('message')}", icon="🚨")
+    except requests.exceptions.RequestException as e:
+        st.error(f"Failed to fetch events for user: {e}", icon="🚨") # Timed out or deadline passed
+    return []
 
 # --- UI HELPER FUNCTIONS ---
-def display_main_availability(all_slots, language, timezone, timezone_friendly):
+def display_incomplete_warning(team_data, members):
+    """Warns when some members' availability timed out or failed in this snapshot, so their counts are partial."""
+    if team_data is None:
+        return
+    names = sorted(team_data.incomplete_specialists & {m['name'] for m in members})
+    if names:
+        st.warning(
+            f"Availability for {', '.join(names)} could not be fully loaded in time, so their open slots "
+            "may be under-counted. They will be retried on the next refresh.",
+            icon="⏳",
+        )
+
+def display_main_availability(slot_index, language, timezone_friendly):
     """Renders the main availability view for a selected language."""
-    if all_slots is None:
+    if slot_index is None:
         return 
 
-    slots_by_day = defaultdict(list)
-    working_days = get_next_working_days(WORKING_DAYS_TO_CHECK, timezone)
-    for slot in all_slots:
-        day = slot["dateTime"].astimezone(timezone).date()
-        if day in working_days:
-            slots_by_day[day].append(slot)
-    
-    if not slots_by_day:
+    times_by_day = slot_index.language_times(language)
+    if not times_by_day:
          st.info(f"No upcoming availability found for **{language}** in the next {WORKING_DAYS_TO_CHECK} working days.")
          return
 
@@ -401,84 +298,349 @@ def display_main_availability(all_slots, language, timezone, timezone_friendly):
         "font-weight: 500;"
     )
 
-    for day in working_days:
-        if day in slots_by_day:
-            st.subheader(day.strftime('%A, %d %B %Y'))
-            day_slots = slots_by_day[day]
-            unique_times = sorted(list(set(s['dateTime'].astimezone(timezone).strftime('%H:%M') for s in day_slots)))
-            
-            time_tags = "".join([f"<div style='{time_slot_style}'>🕒 {time_str}</div>" for time_str in unique_times])
-            st.markdown(f"<div style='display: flex; flex-wrap: wrap;'>{time_tags}</div>", unsafe_allow_html=True)
-            
-            st.divider()
+    for day, unique_times in times_by_day.items():
+        st.subheader(day.strftime('%A, %d %B %Y'))
+        time_tags = "".join([f"<div style='{time_slot_style}'>🕒 {time_str}</div>" for time_str in unique_times])
+        st.markdown(f"<div style='display: flex; flex-wrap: wrap;'>{time_tags}</div>", unsafe_allow_html=True)
+        st.divider()
 
     st.header("Summary of Daily Availability")
-    summary_data = []
-    for day in working_days:
-         if day in slots_by_day:
-            day_slots = slots_by_day[day]
-            slots_by_specialist = defaultdict(list)
-            for slot in day_slots:
-                slots_by_specialist[slot['specialist']].append(slot['dateTime'])
-            total_true_slots = sum(calculate_true_slots(s_slots) for s_slots in slots_by_specialist.values())
-            summary_data.append({"Date": day.strftime('%A, %d %B'), "Bookable Slots": total_true_slots})
+    day_totals = slot_index.language_day_counts(language)
+    summary_data = [
+        {"Date": day.strftime('%A, %d %B'), "Bookable Slots": int(day_totals[day])}
+        for day in times_by_day
+    ]
     if summary_data:
         st.dataframe(pd.DataFrame(summary_data), use_container_width=True, hide_index=True)
 
+def color_summary_cells(val):
+    if val == 0: return 'background-color: #ffcccb; color: black;'
+    elif 1 <= val <= 4: return 'background-color: #d4edda; color: black;'
+    else: return 'background-color: #28a745; color: white;'
+
+def color_heatmap_cells(val):
+    if val == 0: return 'background-color: #ffcccb; color: black;'
+    elif 1 <= val <= 2: return 'background-color: #d4edda; color: black;'
+    else: return 'background-color: #28a745; color: white;'
+
+@st.fragment
+def display_admin_table(title, description, df, cell_style, csv_bytes, download_label, file_name, note=None):
+    """Renders one admin table with its CSV download. A fragment, so it reruns on its own."""
+    st.subheader(title)
+    st.write(description)
+    if note:
+        st.info(note)
+    st.dataframe(df.style.map(cell_style) if cell_style else df, use_container_width=True)
+    # The CSV bytes are prebuilt; downloading needs no rerun at all
+    st.download_button(label=download_label, data=csv_bytes, file_name=file_name, mime="text/csv", on_click="ignore")
+    st.divider()
+
+@st.fragment
+def display_specialist_details(slot_index, slot_table):
+    """Renders the per-specialist slot lists of the admin view. A fragment, so it reruns on its own."""
+    st.subheader("Detailed Specialist Availability")
+    for specialist in sorted(slot_table.names):
+        with st.expander(f"**{specialist}** - {slot_table.count(specialist)} available slots found"):
+            if not slot_table.count(specialist):
+                st.write("No availability in the upcoming period.")
+                continue
+            slots_by_day = slot_index.slots.get(specialist)
+            if not slots_by_day:
+                st.write("No availability on upcoming weekdays.")
+                continue
+
+            for day in slot_index.working_days:
+                 if day in slots_by_day:
+                    st.markdown(f"**{day.strftime('%A, %d %B')}**")
+                    time_strings = [f"`{time_str}`" for time_str in slots_by_day[day]]
+                    st.write(" | ".join(time_strings))
+
+    st.divider()
+
+@st.fragment(run_every=INSTRUMENTATION_REFRESH_SECONDS)
+def display_instrumentation_panel():
+    """Live view of Calendly request, pagination, cache and render metrics. Reruns on its own."""
+    metrics = METRICS.snapshot()
+
+    st.markdown("**Calendly Requests**")
+    request_rows = [
+        {
+            "Endpoint": endpoint,
+            "Requests": stats["count"],
+            "Mean (ms)": stats["mean_ms"],
+            "Max (ms)": stats["max_ms"],
+            "KB": round(stats["bytes"] / 1024, 1),
+            "Status Codes": ", ".join(f"{code}: {n}" for code, n in sorted(stats["status"].items())),
+            **{label: stats["latency_histogram"].get(label, 0) for label in LATENCY_BUCKET_LABELS},
+        }
+        for endpoint, stats in sorted(metrics["requests"].items())
+    ]
+    if request_rows:
+        st.dataframe(pd.DataFrame(request_rows), use_container_width=True, hide_index=True)
+    else:
+        st.write("No Calendly requests made by this process yet.")
+
+    st.markdown("**Caches**")
+    cache_rows = [
+        {
+            "Function": function,
+            "Calls": stats["calls"],
+            "Hits": stats["hits"],
+            "Misses": stats["misses"],
+            "Hit Rate": f"{stats['hits'] / stats['calls']:.0%}" if stats["calls"] else "-",
+        }
+        for function, stats in sorted(metrics["caches"].items())
+    ]
+    cache_rows += [
+        {
+            "Function": f"store: {namespace}",
+            "Calls": counts.get("hits", 0) + counts.get("misses", 0),
+            "Hits": counts.get("hits", 0),
+            "Misses": counts.get("misses", 0),
+            "Hit Rate": f"{counts.get('hits', 0) / (counts.get('hits', 0) + counts.get('misses', 0)):.0%}",
+        }
+        for namespace, counts in sorted(metrics["store"].items())
+    ]
+    if cache_rows:
+        st.dataframe(pd.DataFrame(cache_rows), use_container_width=True, hide_index=True)
+
+    if metrics["coalescing"]:
+        st.markdown("**Request Coalescing**")
+        st.caption("Concurrent calls with the same arguments share one fetch: Executions is how many actually ran.")
+        coalescing_rows = [
+            {"Fetch": name, "Calls": stats["calls"], "Executions": stats["executions"], "Joined In-Flight": stats["joined"]}
+            for name, stats in sorted(metrics["coalescing"].items())
+        ]
+        st.dataframe(pd.DataFrame(coalescing_rows), use_container_width=True, hide_index=True)
+
+    st.markdown("**Shared Snapshots**")
+    st.caption("Versions kept in memory for every session: the latest, plus older ones a session still shows.")
+    registries = [get_team_refresher(calendly_api_key).registry]
+    organization_uri = get_organization_uri(calendly_api_key)
+    if organization_uri:
+        registries.append(get_discovery_registry(organization_uri))
+    snapshot_rows = [
+        {
+            "Registry": registry.name,
+            "Latest Version": stats["latest_version"],
+            "Live Versions": stats["versions"],
+            "Session References": stats["references"],
+            "Derived Views": stats["derived"],
+        }
+        for registry, stats in ((registry, registry.stats()) for registry in registries)
+    ]
+    st.dataframe(pd.DataFrame(snapshot_rows), use_container_width=True, hide_index=True)
+
+    if metrics["strategies"]:
+        st.markdown("**Fetch Strategies**")
+        strategy_rows = [
+            {
+                "Fetcher": name,
+                "Strategy": strategy,
+                "Runs": stats["count"],
+                "Mean Requests": stats["mean_requests"],
+                "Total (ms)": stats["total_ms"],
+            }
+            for name, by_strategy in sorted(metrics["strategies"].items())
+            for strategy, stats in sorted(by_strategy.items())
+        ]
+        st.dataframe(pd.DataFrame(strategy_rows), use_container_width=True, hide_index=True)
+        for name, last in sorted(metrics["last_strategy"].items()):
+            st.caption(f"Last {name}: {last['strategy']} for {last.get('team_users')} of {last.get('organization_users')} users, {last['requests']} requests in {last['seconds']:.2f}s")
+
+    col_pages, col_timings = st.columns(2)
+    with col_pages:
+        st.markdown("**Pages Followed**")
+        st.dataframe(pd.Series(metrics["pages_followed"], name="Pages", dtype="int64"), use_container_width=True)
+        if metrics["events"]:
+            st.markdown("**Events**")
+            st.dataframe(pd.Series(metrics["events"], name="Count", dtype="int64"), use_container_width=True)
+    with col_timings:
+        st.markdown("**Timings**")
+        timings_df = pd.DataFrame.from_dict(metrics["timings"], orient="index")
+        st.dataframe(timings_df, use_container_width=True)
+
+    with st.expander("Raw metrics JSON"):
+        st.json(metrics)
+    col_download, col_reset = st.columns(2)
+    col_download.download_button(
+        label="Download Metrics as JSON",
+        data=json.dumps(metrics, indent=2),
+        file_name="availability_metrics.json",
+        mime="application/json",
+    )
+    if col_reset.button("Reset Metrics"):
+        METRICS.reset()
+
 # --- STREAMLIT UI ---
 
 st.set_page_config(layout="wide")
-st.title("🌏 APAC Availability") # <-- UPDATED TITLE
 
-if 'last_params' not in st.session_state:
-    st.session_state['last_params'] = {}
-if 'availability_data' not in st.session_state:
-    st.session_state['availability_data'] = None
 if 'admin_authenticated' not in st.session_state: 
     st.session_state['admin_authenticated'] = False
 if 'dev_authenticated' not in st.session_state:
     st.session_state['dev_authenticated'] = False
-if 'admin_data' not in st.session_state: 
-    st.session_state['admin_data'] = None
-if 'org_report_data' not in st.session_state:
-    st.session_state['org_report_data'] = None
+if 'snapshot_ref' not in st.session_state:
+    st.session_state['snapshot_ref'] = None
+if 'org_report_ref' not in st.session_state:
+    st.session_state['org_report_ref'] = None
 if 'user_report_data' not in st.session_state: # <-- NEW
     st.session_state['user_report_data'] = None
 
 
 # --- Sidebar ---
 st.sidebar.header("Options")
-# --- LANGUAGE FILTER REMOVED ---
-selected_language = "English" # Hardcoded to English
-# st.sidebar.selectbox("Select language", options=LANGUAGES) # <-- REMOVED
-
+team_registry = get_team_registry()
+team_names = team_registry.team_names
+# A regional link can preselect its team with ?team=<name>
+default_team_name = st.query_params.get("team", team_names[0])
+if default_team_name not in team_names:
+    default_team_name = team_names[0]
+if len(team_names) > 1:
+    selected_team_name = st.sidebar.selectbox("Select team", options=team_names, index=team_names.index(default_team_name))
+else:
+    selected_team_name = default_team_name
+selected_team = team_registry.team(selected_team_name)
+st.title(selected_team.title)
+
+if len(selected_team.languages) > 1:
+    selected_language = st.sidebar.selectbox("Select language", options=selected_team.languages)
+else:
+    selected_language = selected_team.languages[0]
+
+timezone_options = selected_team.timezones
 selected_timezone_friendly = st.sidebar.selectbox(
     "Select your timezone", 
-    options=TIMEZONE_OPTIONS.keys(), 
-    index=list(TIMEZONE_OPTIONS.keys()).index(DEFAULT_TIMEZONE_FRIENDLY)
+    options=timezone_options.keys(), 
+    index=list(timezone_options.keys()).index(selected_team.default_timezone)
 )
-selected_timezone = pytz.timezone(TIMEZONE_OPTIONS[selected_timezone_friendly])
+selected_timezone = pytz.timezone(timezone_options[selected_timezone_friendly])
 
-team_members = get_filtered_team_members()
+team_members = get_filtered_team_members(selected_team_name)
 calendly_api_key = st.secrets.get("CALENDLY_API_KEY")
 
-current_params = {'lang': selected_language, 'tz': selected_timezone_friendly}
-if current_params != st.session_state.get('last_params'):
-    st.session_state['availability_data'] = None 
-    st.session_state['admin_data'] = None 
-    st.session_state['org_report_data'] = None # Clear all data on param change
-    st.session_state['user_report_data'] = None # <-- NEW
+# One snapshot covers every configured team; it is refreshed in the background and
+# stored as tz-aware UTC, so a team or timezone change just re-projects it.
+team_refresher = get_team_refresher(calendly_api_key)
+# Bookings and cancellations pushed by Calendly patch that snapshot in place
+get_webhook_server(calendly_api_key)
 
-if st.session_state['availability_data'] is None:
-    if not team_members:
-        st.warning("No active members found for the APAC team.") # <-- Updated text
-    else:
-        with st.spinner(f"Fetching latest availability for {selected_language}..."):
-            all_slots = fetch_language_availability(team_members, calendly_api_key, selected_language)
-            st.session_state['availability_data'] = all_slots
-            st.session_state['last_params'] = current_params
+def hold_latest_snapshot():
+    """
+    Points this session's SnapshotRef at the latest snapshot version, releasing
+    the one it held before, and returns it (None until a first snapshot exists).
+    Sessions keep only this reference; the snapshot and every view derived from
+    it are shared, and a version goes away once no session shows it any more.
+    """
+    previous = st.session_state.get('snapshot_ref')
+    if team_refresher.registry.latest_version is None:
+        return None
+    st.session_state['snapshot_ref'] = team_refresher.registry.acquire()
+    if previous is not None:
+        previous.release()
+    return st.session_state['snapshot_ref']
 
-display_main_availability(st.session_state['availability_data'], selected_language, selected_timezone, selected_timezone_friendly)
+def wait_for_first_snapshot(on_tick=None):
+    """
+    Cold start only: starts (or joins) the first snapshot fetch under one
+    PAGE_DEADLINE_SECONDS budget for this render, which the fetch shares, and
+    waits for it, calling `on_tick()` every 0.25 s. Returns the held SnapshotRef,
+    or None with a warning if the budget (plus a connect timeout for requests
+    already in flight) runs out; the fetch then finishes in the background.
+    """
+    page_deadline = Deadline(PAGE_DEADLINE_SECONDS)
+    executor = ThreadPoolExecutor(max_workers=1)
+    with deadline_scope(page_deadline):
+        future = submit(executor, team_refresher.get)
+    executor.shutdown(wait=False)
+    # Requests already in flight may overrun the budget by one connect timeout
+    wait_until = page_deadline.expires_at + CONNECT_TIMEOUT_SECONDS
+    while not future.done() and time.monotonic() < wait_until:
+        if on_tick is not None:
+            on_tick()
+        wait([future], timeout=min(0.25, max(wait_until - time.monotonic(), 0)))
+    if not future.done():
+        st.warning("Availability is still loading. Refresh the page in a moment to see it.", icon="⏳")
+        return None
+    future.result()
+    return hold_latest_snapshot()
+
+def get_team_snapshot(spinner_text):
+    """Returns this session's SnapshotRef, only blocking (with a spinner) if no snapshot exists yet; None if that times out."""
+    snapshot_ref = st.session_state.get('snapshot_ref')
+    if snapshot_ref is None:
+        with st.spinner(spinner_text):
+            snapshot_ref = wait_for_first_snapshot()
+    return snapshot_ref
+
+def stream_team_snapshot(language):
+    """
+    Cold start only: waits for the first snapshot while rendering the main view
+    from each specialist's availability as it arrives, so one slow or
+    rate-limited member does not hold up the first paint. If the page budget
+    runs out first, the partial view stays up and None is returned.
+    """
+    arrived = get_arrived_availability(calendly_api_key)
+    working_days = get_next_working_days(WORKING_DAYS_TO_CHECK, selected_timezone)
+    placeholder = st.empty()
+    shown = 0
+
+    def show_arrived():
+        nonlocal shown
+        partial = {m["name"]: arrived[m["name"]] for m in team_members if m["name"] in arrived}
+        if len(partial) > shown:
+            shown = len(partial)
+            with placeholder.container():
+                st.caption(f"Loading availability: {shown} of {len(team_members)} specialists so far...")
+                display_main_availability(
+                    build_slot_index(SlotTable.from_epochs(partial), team_members, selected_timezone, working_days),
+                    language, selected_timezone_friendly,
+                )
+
+    snapshot_ref = wait_for_first_snapshot(on_tick=show_arrived)
+    if snapshot_ref is not None:
+        placeholder.empty()
+    return snapshot_ref
+
+def get_view_key():
+    """(team, timezone, working days): what a view derived from a snapshot version depends on."""
+    working_days = tuple(get_next_working_days(WORKING_DAYS_TO_CHECK, selected_timezone))
+    return selected_team_name, timezone_options[selected_timezone_friendly], working_days
+
+def get_snapshot_index(snapshot_ref):
+    """Returns the SlotIndex for a snapshot version in the selected team and timezone, shared by every session."""
+    view_key = get_view_key()
+    return team_refresher.registry.derive(
+        snapshot_ref.version, ("get_slot_index", *view_key), build_team_slot_index, snapshot_ref.value.data, *view_key
+    )
+
+def get_snapshot_admin_report(snapshot_ref):
+    """Returns the admin tables and CSV bytes for a snapshot version in the selected team and timezone."""
+    team_name, timezone_name, working_days = get_view_key()
+    utilization = team_refresher.registry.derive(
+        snapshot_ref.version, ("get_utilization_index", team_name), build_team_utilization_index,
+        snapshot_ref.value.data, team_name,
+    )
+    return team_refresher.registry.derive(
+        snapshot_ref.version, ("get_admin_report", team_name, timezone_name, working_days), build_team_admin_report,
+        utilization, team_name, timezone_name, working_days,
+    )
+
+# Every rerun moves this session to the latest snapshot version
+hold_latest_snapshot()
+
+slot_index = None
+if not team_members:
+    st.warning(f"No active members found for the {selected_team_name} team.")
+else:
+    team_snapshot = st.session_state.get('snapshot_ref') or stream_team_snapshot(selected_language)
+    if team_snapshot is not None:
+        slot_index = get_snapshot_index(team_snapshot)
+        st.caption(f"Data as of {team_snapshot.value.fetched_at.astimezone(selected_timezone).strftime('%H:%M')}")
+        display_incomplete_warning(team_snapshot.value.data, team_members)
+
+with METRICS.timer("render.main_view"):
+    display_main_availability(slot_index, selected_language, selected_timezone_friendly)
 
 # --- Admin Section ---
 st.sidebar.divider()
@@ -489,8 +651,7 @@ if st.sidebar.button("Unlock Admin View"):
     if password == ADMIN_PASSWORD:
         st.session_state['admin_authenticated'] = True
         st.session_state['dev_authenticated'] = False # Log out of dev
-        st.session_state['admin_data'] = None 
-        st.session_state['org_report_data'] = None 
+        hold_org_report(None)
         st.session_state['user_report_data'] = None # <-- NEW
     else:
         st.sidebar.error("Incorrect password.", key="admin_err")
@@ -505,8 +666,7 @@ if st.sidebar.button("Unlock Developer Tools"):
     if dev_password == DEV_PASSWORD:
         st.session_state['dev_authenticated'] = True
         st.session_state['admin_authenticated'] = False # Log out of admin
-        st.session_state['admin_data'] = None
-        st.session_state['org_report_data'] = None
+        hold_org_report(None)
         st.session_state['user_report_data'] = None # <-- NEW
     else:
         st.sidebar.error("Incorrect developer password.", key="dev_err")
@@ -519,154 +679,46 @@ if st.session_state.get('admin_authenticated'):
     st.divider()
     st.header("🔒 Admin View")
 
-    if st.session_state['admin_data'] is None:
-        with st.spinner("Fetching all team availability for admin view..."):
-            active_team_members = get_filtered_team_members()
-            admin_availability, raw_slots, booked_counts = fetch_all_team_availability(
-                active_team_members, 
-                calendly_api_key
-            )
-            st.session_state['admin_data'] = (admin_availability, raw_slots, booked_counts)
+    admin_snapshot = get_team_snapshot("Fetching all team availability for admin view...")
+    admin_data = None if admin_snapshot is None else admin_snapshot.value.data
     
-    if st.session_state['admin_data'] is None:
-        st.error("Failed to load admin data. Check API key and permissions.")
+    if admin_data is None:
+        if admin_snapshot is not None: # Otherwise it is still loading (see wait_for_first_snapshot)
+            st.error("Failed to load admin data. Check API key and permissions.")
     else:
-        admin_availability, raw_slots, booked_counts = st.session_state['admin_data']
+        # The snapshot covers every team; keep only the selected team's members
+        team_member_names = {m['name'] for m in team_members}
+        admin_availability = admin_data.availability_by_specialist.select(m['name'] for m in team_members)
+        booked_counts = {name: count for name, count in admin_data.booked_event_counts.items() if name in team_member_names}
+        st.caption(f"Data as of {admin_snapshot.value.fetched_at.astimezone(selected_timezone).strftime('%H:%M')}")
+        display_incomplete_warning(admin_data, team_members)
     
         if not admin_availability and not booked_counts:
             st.warning("No availability or booked events found for any team member.")
         else:
-            active_team_members = get_filtered_team_members()
             # Use the selected timezone for Admin view, not just UK
-            admin_timezone = selected_timezone
-            working_days = get_next_working_days(WORKING_DAYS_TO_CHECK, admin_timezone)
-            
-            # --- 1. Language Summary ---
-            st.subheader("Team Summary by Language")
-            st.write("Total bookable slots for the entire team.")
-            st.info("💡 For the best experience, view these tables on a desktop computer.")
-            
-            lang_summary_slots = defaultdict(lambda: defaultdict(int))
-            slots_by_specialist_day = defaultdict(lambda: defaultdict(list))
-
-            for slot in raw_slots:
-                day = slot['dateTime'].astimezone(admin_timezone).date() # Use admin_timezone
-                if day in working_days:
-                    specialist_name = slot['specialist_info']['name']
-                    slots_by_specialist_day[specialist_name][day].append(slot['dateTime'])
-            
-            for specialist, day_slots in slots_by_specialist_day.items():
-                specialist_info = next((m for m in active_team_members if m['name'] == specialist), None)
-                if specialist_info:
-                    for day, slots in day_slots.items():
-                        true_slots = calculate_true_slots(slots)
-                        for lang in specialist_info['languages']:
-                            lang_summary_slots[lang][day] += true_slots
-
-            summary_data = []
-            for lang in LANGUAGES: # This will just be "English"
-                row = {"Language": lang}
-                for day in working_days:
-                    day_str = day.strftime('%a %d/%m')
-                    row[day_str] = lang_summary_slots[lang].get(day, 0)
-                summary_data.append(row)
-            summary_df = pd.DataFrame(summary_data).set_index("Language")
-
-            def color_summary_cells(val):
-                if val == 0: return 'background-color: #ffcccb; color: black;'
-                elif 1 <= val <= 4: return 'background-color: #d4edda; color: black;'
-                else: return 'background-color: #28a745; color: white;'
-
-            st.dataframe(summary_df.style.applymap(color_summary_cells), use_container_width=True)
-            st.download_button(
-                 label="Download Language Summary as CSV",
-                 data=convert_df_to_csv(summary_df),
-                 file_name="language_summary.csv",
-                 mime="text/csv",
-             )
-            st.divider()
-
-            # --- 2. Team Capacity Heatmap ---
-            st.subheader("Team Capacity Heatmap")
-            st.write("A visual overview of each specialist's bookable slots per day.")
-            heatmap_data = defaultdict(lambda: {day.strftime('%a %d/%m'): 0 for day in working_days})
-            for specialist, slots in admin_availability.items():
-                slots_by_day = defaultdict(list)
-                for slot_time in slots:
-                    day = slot_time.astimezone(admin_timezone).date() # Use admin_timezone
-                    if day in working_days:
-                        slots_by_day[day].append(slot_time)
-                for day, day_slots in slots_by_day.items():
-                    heatmap_data[specialist][day.strftime('%a %d/%m')] = calculate_true_slots(day_slots)
-            
-            heatmap_df = pd.DataFrame(heatmap_data).T
-            heatmap_df.index.name = "Specialist"
-            heatmap_df = heatmap_df.reindex(sorted(heatmap_df.index))
-            
-            def color_heatmap_cells(val):
-                if val == 0: return 'background-color: #ffcccb; color: black;'
-                elif 1 <= val <= 2: return 'background-color: #d4edda; color: black;'
-                else: return 'background-color: #28a745; color: white;'
-            
-            st.dataframe(heatmap_df.style.applymap(color_heatmap_cells), use_container_width=True)
-            st.download_button(
-                 label="Download Heatmap as CSV",
-                 data=convert_df_to_csv(heatmap_df),
-                 file_name="team_capacity_heatmap.csv",
-                 mime="text/csv",
-             )
-            st.divider()
-            
-            # --- 3. Booked Appointments Report ---
-            st.subheader("Booked Appointments Report")
-            st.write(f"Total count of booked appointments 60 minutes or longer in the next {WORKING_DAYS_TO_CHECK} working days.")
-            
-            report_data = []
-            specialist_names = sorted([m['name'] for m in active_team_members])
-            
-            for specialist in specialist_names:
-                report_data.append({
-                    "Specialist": specialist, 
-                    "Booked Appointments (60+ min)": booked_counts.get(specialist, 0)
-                })
-                
-            report_df = pd.DataFrame(report_data).set_index("Specialist")
-            st.dataframe(report_df, use_container_width=True)
-            st.download_button(
-                 label="Download Booked Report as CSV",
-                 data=convert_df_to_csv(report_df),
-                 file_name="booked_appointments_report.csv",
-                 mime="text/csv",
-             )
-            st.divider()
-
-            # --- 4. Detailed Specialist Availability ---
-            st.subheader("Detailed Specialist Availability")
-            sorted_specialists = sorted(admin_availability.keys())
-            for specialist in sorted_specialists:
-                with st.expander(f"**{specialist}** - {len(admin_availability.get(specialist, []))} available slots found"):
-                    slots = admin_availability.get(specialist)
-                    if not slots:
-                        st.write("No availability in the upcoming period.")
-                        continue
-                    slots_by_day = defaultdict(list)
-                    for slot_time_utc in slots:
-                        day = slot_time_utc.astimezone(admin_timezone).date() # Use admin_timezone
-                        if day in working_days:
-                            slots_by_day[day].append(slot_time_utc.astimezone(admin_timezone)) # Use admin_timezone
-                    
-                    if not slots_by_day:
-                        st.write("No availability on upcoming weekdays.")
-                        continue
-
-                    for day in working_days:
-                         if day in slots_by_day:
-                            st.markdown(f"**{day.strftime('%A, %d %B')}**")
-                            day_slots = sorted(slots_by_day[day])
-                            time_strings = [f"`{s.strftime('%H:%M')}`" for s in day_slots]
-                            st.write(" | ".join(time_strings))
-            
-            st.divider()
+            admin_index = get_snapshot_index(admin_snapshot)
+            admin_tables, admin_csv = get_snapshot_admin_report(admin_snapshot)
+
+            with METRICS.timer("render.admin_tables"):
+                display_admin_table(
+                    "Team Summary by Language", "Total bookable slots for the entire team.",
+                    admin_tables.summary, color_summary_cells, admin_csv["summary"],
+                    "Download Language Summary as CSV", "language_summary.csv",
+                    note="💡 For the best experience, view these tables on a desktop computer.",
+                )
+                display_admin_table(
+                    "Team Capacity Heatmap", "A visual overview of each specialist's bookable slots per day.",
+                    admin_tables.heatmap, color_heatmap_cells, admin_csv["heatmap"],
+                    "Download Heatmap as CSV", "team_capacity_heatmap.csv",
+                )
+                display_admin_table(
+                    "Booked Appointments Report",
+                    f"Booked appointments 60 minutes or longer, plus booked hours, free hours and utilization over the next {WORKING_DAYS_TO_CHECK} working days.",
+                    admin_tables.report, None, admin_csv["report"],
+                    "Download Booked Report as CSV", "booked_appointments_report.csv",
+                )
+            display_specialist_details(admin_index, admin_availability)
 
 # --- MAIN PAGE - DEV VIEW ---
 if st.session_state.get('dev_authenticated'):
@@ -674,20 +726,27 @@ if st.session_state.get('dev_authenticated'):
     st.divider()
     st.header("⚙️ Developer Tools")
 
+    # --- API & Cache Instrumentation ---
+    st.divider()
+    st.subheader("API & Cache Instrumentation")
+    st.write(f"Process-wide since the last reset; refreshes every {INSTRUMENTATION_REFRESH_SECONDS} seconds. Each request is also logged as JSON on the `availability.metrics` logger.")
+    display_instrumentation_panel()
+
     # --- NEW: Single User Tool ---
     st.divider()
     st.subheader("Single User Event-Type Discovery (Fast)")
     st.write("Fetch all 'solo' event types for one specific user URI.")
     
-    # Pre-fill with Anthony's URI as a helper
-    default_user_uri = TEAM_DATA[0].get('userUri', '') 
+    # Pre-fill with the first team member's URI as a helper
+    default_user_uri = selected_team.members[0].get('userUri', '') if selected_team.members else ''
     user_uri_to_check = st.text_input("User URI to check", value=default_user_uri)
     
     if st.button("Fetch Events for User"):
         st.session_state['user_report_data'] = None # Clear old
         if user_uri_to_check:
             with st.spinner(f"Fetching events for {user_uri_to_check}..."):
-                report_data = fetch_user_event_types(user_uri_to_check, calendly_api_key)
+                with deadline_scope(Deadline(PAGE_DEADLINE_SECONDS)):
+                    report_data = fetch_user_event_types(user_uri_to_check, calendly_api_key)
                 if report_data:
                     df = pd.DataFrame(report_data)
                     st.session_state['user_report_data'] = df
@@ -701,26 +760,42 @@ if st.session_state.get('dev_authenticated'):
 
     # --- Original Organization Discovery Tool ---
     st.divider()
-    st.subheader("Organization Discovery Tool (Slow)")
+    st.subheader("Organization Discovery Tool")
     st.write("A tool to find all users and their 'solo' event types in your Calendly organization. Use this to find the URIs needed to build new team apps.")
-    st.warning("This tool scans your *entire* organization and may be slow.")
+    st.warning("This tool scans your *entire* organization. Rows appear as each user's event types arrive.")
     
     if st.button("Run Organization Discovery Report"):
-        st.session_state['org_report_data'] = None # Clear old data
+        hold_org_report(None) # Clear old data
         organization_uri = get_organization_uri(calendly_api_key)
-        if organization_uri:
-            with st.spinner("Scanning your organization... This may take a minute."):
-                report_data = fetch_organization_discovery_report(organization_uri, calendly_api_key)
-                if report_data:
-                    df = pd.DataFrame(report_data)
-                    st.session_state['org_report_data'] = df
-                else:
-                    st.error("Could not retrieve organization report.")
+        registry = get_discovery_registry(organization_uri) if organization_uri else None
+        shared_report = acquire_fresh_org_report(registry) if registry is not None else None
+        if shared_report is not None:
+            # Another session scanned this organization recently; show its report instead of rescanning
+            hold_org_report(shared_report)
+        elif organization_uri:
+            seen_version = registry.latest_version
+            progress = st.progress(0.0, text="Scanning your organization...")
+            live_table = st.empty()
+            report_data = []
+            with deadline_scope(Deadline(PAGE_DEADLINE_SECONDS)):
+                for users_done, users_total, rows in stream_organization_discovery_report(organization_uri, calendly_api_key):
+                    progress.progress(users_done / users_total, text=f"Scanned {users_done} of {users_total} users")
+                    if rows:
+                        report_data.extend(rows)
+                        live_table.dataframe(pd.DataFrame(report_data), use_container_width=True)
+            progress.empty()
+            live_table.empty()
+            if report_data:
+                report = Snapshot(to_discovery_report_df(report_data), datetime.now(pytz.UTC))
+                hold_org_report(registry.acquire_or_publish(report, seen_version))
+            else:
+                st.error("Could not retrieve organization report.")
         else:
             st.error("Could not retrieve organization URI. Check API Key permissions.")
 
-    if st.session_state['org_report_data'] is not None:
-        df = st.session_state['org_report_data']
+    if st.session_state['org_report_ref'] is not None:
+        df, fetched_at = st.session_state['org_report_ref'].value
+        st.caption(f"Scanned at {fetched_at.strftime('%H:%M UTC')}; shared with every session for up to {DISCOVERY_REPORT_TTL_SECONDS // 60} minutes.")
         st.dataframe(df, use_container_width=True)
         st.download_button(
             label="Download Full Report as CSV",
@@ -0,0 +1 @@
+"""Calendly data access and aggregation helpers used by the availability app."""
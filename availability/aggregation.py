@@ -0,0 +1,105 @@
+"""
+Columnar slot aggregation for the admin tables.
+
+Slots are flattened into int64 epoch-second arrays with integer specialist
+codes, so timezone bucketing, the working-day filter and the greedy
+non-overlapping slot count run in bulk with NumPy/pandas instead of per-slot
+Python loops.
+"""
+from collections import namedtuple
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+SECONDS_PER_DAY = 86400
+_EPOCH_DATE = date(1970, 1, 1)
+
+# day_counts: DataFrame (specialist x working day) of true (non-overlapping) slots.
+# slots: DataFrame of every working-day slot with specialist, day and local time,
+#        sorted by specialist then start time.
+SlotAggregate = namedtuple("SlotAggregate", ["day_counts", "slots"])
+
+
+def to_epoch_seconds(date_times):
+    """Converts tz-aware datetimes to an int64 array of UTC epoch seconds."""
+    if not len(date_times):
+        return np.empty(0, dtype=np.int64)
+    return pd.to_datetime(list(date_times), utc=True).as_unit("s").asi8
+
+
+def to_day_numbers(days):
+    """Converts dates to days since 1970-01-01."""
+    return np.array([(day - _EPOCH_DATE).days for day in days], dtype=np.int64)
+
+
+def count_true_slots(group_ids, epochs, slot_duration_seconds, num_groups):
+    """
+    Greedy non-overlapping slot count per group, in bulk. Inputs must be sorted
+    by (group, epoch). Each slot's successor is the first slot in the same group
+    starting at least one slot duration later; counts follow those chains from
+    each group's first slot, advancing every group one step per iteration.
+    """
+    counts = np.zeros(num_groups, dtype=np.int64)
+    n = len(epochs)
+    if n == 0:
+        return counts
+
+    offsets = epochs - epochs.min()
+    stride = int(offsets.max()) + slot_duration_seconds + 1
+    keys = group_ids * stride + offsets
+    successors = np.searchsorted(keys, keys + slot_duration_seconds, side="left")
+    in_group = successors < n
+    in_group[in_group] = group_ids[successors[in_group]] == group_ids[in_group]
+    successors = np.where(in_group, successors, -1)
+
+    current = np.flatnonzero(np.r_[True, group_ids[1:] != group_ids[:-1]])
+    while current.size:
+        counts[group_ids[current]] += 1
+        current = successors[current]
+        current = current[current >= 0]
+    return counts
+
+
+def table_arrays(slot_table):
+    """(specialist codes, epochs) NumPy views of a SlotTable; the epochs are not copied."""
+    epochs = np.frombuffer(slot_table.epochs, dtype=np.int64) if len(slot_table) else np.empty(0, dtype=np.int64)
+    codes = np.repeat(np.arange(len(slot_table.names), dtype=np.int64), np.diff(slot_table.offsets))
+    return codes, epochs
+
+
+def aggregate_slots(slot_table, timezone, working_days, slot_duration_minutes):
+    """
+    Buckets every specialist's UTC slots (a SlotTable) into local working days of
+    `timezone` and counts true slots per (specialist, day). Returns a SlotAggregate.
+    """
+    names = list(slot_table.names)
+    codes, epochs = table_arrays(slot_table)
+
+    local = pd.to_datetime(epochs, unit="s", utc=True).tz_convert(timezone).tz_localize(None)
+    local_days = local.as_unit("s").asi8 // SECONDS_PER_DAY
+
+    working_day_numbers = to_day_numbers(working_days)
+    on_working_day = np.isin(local_days, working_day_numbers)
+    codes, epochs, local = codes[on_working_day], epochs[on_working_day], local[on_working_day]
+    day_index = np.searchsorted(working_day_numbers, local_days[on_working_day])
+
+    num_days = len(working_days)
+    group_ids = codes * num_days + day_index
+    order = np.lexsort((epochs, group_ids))
+    group_ids, epochs, codes, day_index, local = (
+        group_ids[order], epochs[order], codes[order], day_index[order], local[order]
+    )
+
+    counts = count_true_slots(group_ids, epochs, slot_duration_minutes * 60, len(names) * num_days)
+    day_counts = pd.DataFrame(counts.reshape(len(names), num_days), index=names, columns=list(working_days))
+    # Like the per-slot loops, only specialists with a working-day slot get a row
+    day_counts = day_counts.iloc[np.unique(codes)]
+
+    days = np.array(list(working_days), dtype=object)
+    slots = pd.DataFrame({
+        "specialist": np.array(names, dtype=object)[codes],
+        "day": days[day_index],
+        "time": local.strftime("%H:%M"),
+    })
+    return SlotAggregate(day_counts, slots)
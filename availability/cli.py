@@ -0,0 +1,98 @@
+"""
+Batch availability reports.
+
+Fetches availability and booked events once for the unique members of every
+selected team, then writes each team's language summary, capacity heatmap and
+booked appointments report as CSV files under <output-dir>/<team>/, without
+starting the Streamlit UI.
+
+    CALENDLY_API_KEY=... python -m availability.cli --output-dir reports \\
+        --team APAC --team EMEA --timezone Europe/London
+"""
+import argparse
+import logging
+import os
+import sys
+
+import pytz
+
+from availability.core import WORKING_DAYS_TO_CHECK, fetch_all_team_availability, get_next_working_days
+from availability.teams import DEFAULT_CONFIG_PATH, load_registry
+
+logger = logging.getLogger("availability.cli")
+
+
+def resolve_timezone(team, timezone_name=None):
+    """Accepts one of the team's timezone labels or any IANA name; defaults to the team's default."""
+    timezone_name = timezone_name or team.default_timezone
+    return pytz.timezone(team.timezones.get(timezone_name, timezone_name))
+
+
+def write_team_reports(team, members, team_data, timezone, output_dir, working_days=WORKING_DAYS_TO_CHECK):
+    """Builds one team's admin tables from a fetched snapshot and writes them as CSV. Returns the paths."""
+    # pandas/NumPy are only needed once there is something to aggregate
+    from availability.reports import REPORT_FILE_NAMES, build_admin_tables, build_utilization_index
+
+    days = get_next_working_days(working_days, timezone)
+    utilization = build_utilization_index(team_data, members)
+    tables = build_admin_tables(utilization, members, team.languages, timezone, days)
+
+    team_dir = os.path.join(output_dir, team.name)
+    os.makedirs(team_dir, exist_ok=True)
+    paths = []
+    for table_name, df in tables._asdict().items():
+        path = os.path.join(team_dir, REPORT_FILE_NAMES[table_name])
+        df.to_csv(path, index=True)
+        paths.append(path)
+    return paths
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--team", action="append", dest="teams", help="team to report on (repeatable; default: all)")
+    parser.add_argument("--timezone", help="timezone label from the team config or IANA name (default: each team's default)")
+    parser.add_argument("--working-days", type=int, default=WORKING_DAYS_TO_CHECK)
+    parser.add_argument("--output-dir", default="reports")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH, help="teams config file")
+    parser.add_argument("--api-key", default=os.environ.get("CALENDLY_API_KEY"), help="default: $CALENDLY_API_KEY")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    if not args.api_key:
+        sys.exit("No Calendly API key: pass --api-key or set CALENDLY_API_KEY.")
+
+    registry = load_registry(args.config)
+    team_names = args.teams or registry.team_names
+    unknown = [name for name in team_names if name not in registry.teams]
+    if unknown:
+        sys.exit(f"Unknown team(s): {', '.join(unknown)}. Configured: {', '.join(registry.team_names)}")
+
+    # One fetch for every selected team; members shared by teams are fetched once
+    members = registry.all_active_members(team_names)
+    # Only the working days each team's report shows are fetched
+    timezones = {team_name: resolve_timezone(registry.team(team_name), args.timezone) for team_name in team_names}
+    # A batch run prefers complete reports over a deadline; each request still has its own timeouts
+    team_data = fetch_all_team_availability(
+        members, args.api_key, deadline_seconds=None,
+        timezones=list(dict.fromkeys(timezones.values())), working_days=args.working_days,
+    )
+    if team_data.incomplete_specialists:
+        logger.warning(
+            "Availability is incomplete (a request failed or timed out) for: %s",
+            ", ".join(sorted(team_data.incomplete_specialists)),
+        )
+
+    for team_name in team_names:
+        team = registry.team(team_name)
+        paths = write_team_reports(
+            team, registry.active_members(team_name), team_data,
+            timezones[team_name], args.output_dir, args.working_days,
+        )
+        logger.info("%s: wrote %s", team_name, ", ".join(paths))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Shared Calendly HTTP client.
+
+Every outbound Calendly request goes through a CalendlyClient: one pooled
+keep-alive requests.Session per API key, a token bucket that keeps us under
+Calendly's rate limit (and backs off on 429 / Retry-After), and a semaphore
+that bounds the number of in-flight requests. Every request has connect and
+read timeouts, capped by the caller's deadline (availability.deadline), and
+idempotent reads can be hedged: if no response arrives within `hedge_after`
+seconds of the request going out, a second identical request is sent and the
+first answer wins. Time spent waiting on the rate limiter does not count, and
+no hedge is sent while the limiter is paused or has no spare token.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from availability.deadline import current_deadline, deadline_scope
+from availability.metrics import METRICS
+
+# Overridable so benchmarks can point the app at a local Calendly stand-in
+CALENDLY_API_BASE = os.environ.get("CALENDLY_API_BASE", "https://api.calendly.com")
+MAX_CONCURRENT_REQUESTS = 8
+REQUESTS_PER_SECOND = 8
+BURST_SIZE = 16
+MAX_RETRIES = 3
+DEFAULT_RETRY_AFTER_SECONDS = 2
+CONNECT_TIMEOUT_SECONDS = 3.05
+READ_TIMEOUT_SECONDS = 15
+# Hedged reads: send a second copy of a request still unanswered after this long (0 disables)
+HEDGE_AFTER_SECONDS = float(os.environ.get("CALENDLY_HEDGE_AFTER_SECONDS", 2.5))
+
+# Runs hedged requests and their hedges; sized so queued primaries do not trigger spurious hedges
+_hedge_pool = ThreadPoolExecutor(max_workers=4 * MAX_CONCURRENT_REQUESTS, thread_name_prefix="calendly-hedge")
+
+
+def format_to_iso_z(dt):
+    """Formats a datetime object to the ISO Z format Calendly expects."""
+    return dt.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+class TokenBucket:
+    """Thread-safe token bucket. acquire() blocks until a token is available."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def paused_for(self):
+        """Seconds until a pause() ends (0 if not paused)."""
+        with self._lock:
+            return max(self._paused_until - time.monotonic(), 0.0)
+
+    def has_spare(self):
+        """True if a token could be handed out right now without waiting."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return False
+            return self._tokens + (now - self._updated) * self.rate >= 1
+
+    def pause(self, seconds):
+        """Stops handing out tokens for `seconds` (used when Calendly returns 429)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+            self._updated = self._paused_until
+
+
+def parse_retry_after(response, attempt):
+    """Returns the number of seconds to wait before retrying a 429 response."""
+    value = response.headers.get("Retry-After")
+    try:
+        return max(float(value), 0)
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER_SECONDS * (2 ** attempt)
+
+
+class _SendClock:
+    """When the current attempt of a hedged request went out (past the rate limiter and semaphore)."""
+
+    def __init__(self):
+        self.sent_at = None
+        self.changed = threading.Event()
+
+    def mark(self, sent):
+        """Called with True as an attempt is sent, and with False when it must be retried after a 429."""
+        if sent:
+            self.sent_at = time.monotonic()
+            self.changed.set()
+        else:
+            self.changed.clear()
+            self.sent_at = None
+
+
+class CalendlyClient:
+    """Pooled, rate-limited GET client for a single Calendly API key."""
+
+    def __init__(self, api_key, max_concurrency=MAX_CONCURRENT_REQUESTS,
+                 rate=REQUESTS_PER_SECOND, burst=BURST_SIZE):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json',
+        })
+        self.bucket = TokenBucket(rate, burst)
+        self._in_flight = threading.BoundedSemaphore(max_concurrency)
+
+    def get(self, url, params=None, hedge_after=None):
+        """
+        Sends a GET request and returns the response. Retries 429s after the
+        Retry-After delay; any other error status raises requests.HTTPError, and
+        a timeout (or the deadline passing) raises requests.Timeout. With
+        `hedge_after`, a second copy is sent if the first is still unanswered
+        after being sent; only use it for idempotent reads.
+        """
+        if not hedge_after:
+            return self._get(url, params)
+        deadline = current_deadline()
+        clock = _SendClock()
+        primary = _hedge_pool.submit(self._get_within, deadline, url, params, clock.mark)
+        primary.add_done_callback(lambda _: clock.changed.set())
+        while True:
+            # Only time on the wire counts: wait while the primary is queued on the limiter or
+            # backing off a 429, and restart the clock with each retry
+            clock.changed.wait()
+            sent_at = clock.sent_at
+            if sent_at is None:
+                if primary.done():
+                    return primary.result()
+                continue
+            wait = hedge_after - (time.monotonic() - sent_at)
+            if wait <= 0:
+                # A paused or drained limiter means no hedge yet
+                wait = self.bucket.paused_for() or (0 if self.bucket.has_spare() else 1 / self.bucket.rate)
+                if not wait:
+                    break
+            try:
+                return primary.result(timeout=wait)
+            except FutureTimeout:
+                pass
+        METRICS.record_event("calendly.hedge_sent")
+        hedge = _hedge_pool.submit(self._get_within, deadline, url, params)
+        error = None
+        for future in as_completed([primary, hedge]):
+            try:
+                response = future.result()
+            except requests.exceptions.RequestException as e:
+                error = error or e
+                continue
+            if future is hedge:
+                METRICS.record_event("calendly.hedge_won")
+            return response
+        raise error
+
+    def _get_within(self, deadline, url, params, on_send=None):
+        with deadline_scope(deadline):
+            return self._get(url, params, on_send)
+
+    def _get(self, url, params=None, on_send=None):
+        deadline = current_deadline()
+        for attempt in range(MAX_RETRIES + 1):
+            self.bucket.acquire()
+            read_timeout = READ_TIMEOUT_SECONDS
+            if deadline is not None:
+                deadline.check()
+                read_timeout = min(read_timeout, max(deadline.remaining(), 0.001))
+            with self._in_flight:
+                if on_send is not None:
+                    on_send(True)
+                started = time.perf_counter()
+                try:
+                    response = self.session.get(url, params=params, timeout=(CONNECT_TIMEOUT_SECONDS, read_timeout))
+                except requests.exceptions.Timeout:
+                    METRICS.record_request(url, "timeout", time.perf_counter() - started, 0)
+                    raise
+                except requests.exceptions.RequestException:
+                    METRICS.record_request(url, "error", time.perf_counter() - started, 0)
+                    raise
+            METRICS.record_request(url, response.status_code, time.perf_counter() - started, len(response.content))
+            if response.status_code == 429 and attempt < MAX_RETRIES:
+                if on_send is not None:
+                    on_send(False)
+                self.bucket.pause(parse_retry_after(response, attempt))
+                continue
+            response.raise_for_status()
+            return response
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key):
+    """Returns the process-wide CalendlyClient for `api_key`, creating it on first use."""
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = CalendlyClient(api_key)
+        return client
@@ -0,0 +1,385 @@
+"""
+Headless availability core.
+
+The fetch and slot-counting functions behind the app, with no Streamlit
+dependency, so batch jobs and other systems can use them without starting the
+UI. Errors are passed to an `on_error(message)` callback (logged by default)
+and the functions return a safe fallback, so one failed call never aborts a
+whole report. Only requests/pytz are imported here; pandas and NumPy are only
+needed by availability.reports.
+"""
+import logging
+import time
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+
+import pytz
+import requests
+
+from availability.client import CALENDLY_API_BASE, get_client
+from availability.deadline import Deadline, current_deadline, deadline_scope
+from availability.discovery import list_organization_memberships
+from availability.events import count_long_events, get_event_sync, merge_events, parse_calendly_time
+from availability.metrics import METRICS
+from availability.scheduler import fetch_event_type_slots, plan_windows, run_tasks, split_windows, stream_event_type_slots
+from availability.slot_table import SlotTable, to_epochs
+from availability.slots import list_available_times
+from availability.store import persisted
+
+logger = logging.getLogger(__name__)
+
+WORKING_DAYS_TO_CHECK = 10
+MINIMUM_NOTICE_HOURS = 21
+SLOT_DURATION_MINUTES = 120
+
+# Booked-events strategy: per-user scheduled_events?user= syncs for a team that is
+# small both absolutely and relative to the organization, otherwise one org-wide scan
+ORG_SCAN, PER_USER = "org_scan", "per_user"
+PER_USER_MAX_USERS = 25
+PER_USER_MAX_ORG_SHARE = 0.2
+ORGANIZATION_SIZE_TTL_SECONDS = 86400
+# Budget for a whole snapshot fetch; windows still out when it passes are marked incomplete
+FETCH_DEADLINE_SECONDS = 45
+
+# (organization_uri, api_key) -> the EventSyncs used by the last booked-events fetch
+_team_syncs = {}
+
+# What fetch_all_team_availability returns (and the app snapshots):
+#   availability_by_specialist: SlotTable of bookable slot starts per name
+#   booked_event_counts:        {name: long (60+ min) booked events in the scheduled range}
+#   booked_events:              {name: [(start, end, is_long)]} booked intervals, for availability.utilization
+#   incomplete_specialists:     frozenset of names whose availability is partial (a window failed or timed out)
+TeamData = namedtuple(
+    "TeamData", ["availability_by_specialist", "booked_event_counts", "booked_events", "incomplete_specialists"],
+    defaults=[frozenset()],
+)
+
+
+def describe_api_error(error, context):
+    """Turns a failed Calendly call into the message shown to users."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return f"A non-HTTP error occurred: {error}"
+    if response.status_code == 401:
+        return "Invalid API Key. Please check the configured CALENDLY_API_KEY."
+    if response.status_code == 403 and context == "Events":
+        return "API Key Error: This key does not have Organization-level permission to read scheduled events for all users. Please use an Admin-generated token."
+    try:
+        message = response.json().get("message", "Unknown Error")
+    except ValueError:
+        message = "Unknown Error"
+    return f"Calendly API Error ({context}): {message}"
+
+
+def get_working_day_ranges(timezones=(pytz.UTC,), working_days=WORKING_DAYS_TO_CHECK, now=None):
+    """
+    Returns the sorted [start, end) UTC bounds of the next `working_days` working
+    days in each of `timezones`: every local day any view can display.
+    """
+    ranges = set()
+    for timezone in timezones:
+        for day in get_next_working_days(working_days, timezone, now):
+            start, end = (
+                timezone.localize(datetime(d.year, d.month, d.day)).astimezone(pytz.UTC)
+                for d in (day, day + timedelta(days=1))
+            )
+            ranges.add((start, end))
+    return sorted(ranges)
+
+
+def plan_availability_windows(timezones=(pytz.UTC,), working_days=WORKING_DAYS_TO_CHECK, now=None):
+    """
+    Returns the availability query windows covering the displayed working days
+    in `timezones` from the MINIMUM_NOTICE_HOURS cut-off on, in as few requests
+    as possible (see plan_windows). The cut-off is floored to the hour and later
+    windows start at local midnights, so the cache keys stay stable across reruns
+    and sessions; slots before the exact cut-off are dropped after the cache read.
+    """
+    cutoff = get_minimum_booking_time(now).replace(minute=0, second=0, microsecond=0)
+    return plan_windows(
+        (max(start, cutoff), end) for start, end in get_working_day_ranges(timezones, working_days, now) if end > cutoff
+    )
+
+
+def get_scheduled_events_range(timezones=(pytz.UTC,), working_days=WORKING_DAYS_TO_CHECK, now=None):
+    """Returns the (start, end) range for the booked-events scan: the displayed working days, today included."""
+    ranges = get_working_day_ranges(timezones, working_days, now)
+    return ranges[0][0], max(end for _, end in ranges)
+
+
+def get_minimum_booking_time(now=None):
+    """Earliest slot start that can still be booked."""
+    return (now or datetime.now(pytz.UTC)) + timedelta(hours=MINIMUM_NOTICE_HOURS)
+
+
+@persisted("availability_window", ttl_seconds=600)
+def get_availability_window(solo_event_uri, window_start, window_end, api_key):
+    """
+    Fetches available slots for one event type within a single (max 7-day) window.
+    HTTP errors and timeouts propagate (and are not cached), so callers can mark
+    the window's specialist incomplete instead of counting zero slots.
+    """
+    if not api_key: return []
+    return list_available_times(solo_event_uri, window_start, window_end, api_key)
+
+
+def get_user_availability(solo_event_uri, start_date, end_date, api_key, fetch_window=get_availability_window):
+    """
+    Fetches available slots from the Calendly API for a single user.
+    Each 7-day window is fetched (and cached) separately, keyed on the aligned window bounds.
+    """
+    if not api_key: return []
+    windows = split_windows(start_date, end_date)
+    return fetch_event_type_slots(fetch_window, [solo_event_uri], windows, api_key)[solo_event_uri]
+
+
+@persisted("organization_uri", ttl_seconds=3600)
+def fetch_organization_uri(api_key):
+    """Fetches the organization URI associated with the API key. HTTP errors propagate."""
+    response = get_client(api_key).get(f"{CALENDLY_API_BASE}/users/me")
+    return response.json().get("resource", {}).get("current_organization")
+
+
+def get_organization_uri(api_key, on_error=logger.error):
+    """Fetches the organization URI associated with the API key, or None on error."""
+    if not api_key:
+        return None
+    try:
+        return fetch_organization_uri(api_key)
+    except requests.exceptions.RequestException as e:
+        on_error(describe_api_error(e, "User"))
+        return None
+
+
+@persisted("organization_size", ttl_seconds=ORGANIZATION_SIZE_TTL_SECONDS)
+def fetch_organization_size(organization_uri, api_key):
+    """Number of members in the organization. HTTP errors propagate."""
+    return len(list_organization_memberships(organization_uri, api_key))
+
+
+def choose_events_strategy(team_size, organization_size):
+    """PER_USER when the team is small both absolutely and as a share of the organization, else ORG_SCAN."""
+    if not organization_size or team_size > PER_USER_MAX_USERS:
+        return ORG_SCAN
+    return PER_USER if team_size <= organization_size * PER_USER_MAX_ORG_SHARE else ORG_SCAN
+
+
+def sync_booked_events(organization_uri, start_date, end_date, api_key, on_error=logger.error, user_uris=None,
+                       reconcile_interval_seconds=None):
+    """
+    Returns the booked events in [start_date, end_date) as {uri: SyncedEvent}.
+    Events are synced incrementally (see availability.events), so a repeat call
+    only fetches new days and cancellations rather than re-scanning the whole horizon.
+
+    Without `user_uris` the whole organization is scanned. With them, the
+    strategy is chosen from the team and organization sizes (choose_events_strategy),
+    and the choice and its cost are recorded in METRICS under "scheduled_events".
+    `reconcile_interval_seconds` sets how often the syncs fully re-scan (see
+    availability.events.get_event_sync).
+    """
+    if not api_key or not organization_uri:
+        return {}
+
+    user_uris = list(dict.fromkeys(uri for uri in user_uris or [] if uri))
+    strategy, organization_size = ORG_SCAN, None
+    if user_uris:
+        try:
+            organization_size = fetch_organization_size(organization_uri, api_key)
+        except requests.exceptions.RequestException as e:
+            logger.warning("Could not size the organization, scanning it instead: %s", describe_api_error(e, "Members"))
+        strategy = choose_events_strategy(len(user_uris), organization_size)
+
+    if strategy == PER_USER:
+        syncs = [get_event_sync(organization_uri, api_key, uri, reconcile_interval_seconds) for uri in user_uris]
+    else:
+        syncs = [get_event_sync(organization_uri, api_key, reconcile_interval_seconds=reconcile_interval_seconds)]
+    _team_syncs[(organization_uri, api_key)] = syncs
+
+    started = time.perf_counter()
+    try:
+        run_tasks(lambda event_sync: event_sync.sync(start_date, end_date), [(event_sync,) for event_sync in syncs])
+    except Exception as e:
+        on_error(describe_api_error(e, "Events"))
+    finally:
+        METRICS.record_strategy(
+            "scheduled_events", strategy, sum(event_sync.last_sync_requests for event_sync in syncs),
+            time.perf_counter() - started, team_users=len(user_uris) or None, organization_users=organization_size,
+        )
+    # After a failure these are the last successfully synced events
+    return merge_events(syncs)
+
+
+def fetch_all_scheduled_events(organization_uri, start_date, end_date, api_key, on_error=logger.error, user_uris=None):
+    """Returns a count of long booked events per user URI (see sync_booked_events)."""
+    return count_long_events(sync_booked_events(organization_uri, start_date, end_date, api_key, on_error, user_uris))
+
+
+def group_booked_events(events_by_uri, team_members):
+    """Splits synced events into ({name: long event count}, {name: [(start, end, is_long)]}) for the members."""
+    user_uri_to_name = {m['userUri']: m['name'] for m in team_members}
+    booked_events = defaultdict(list)
+    for synced in events_by_uri.values():
+        name = user_uri_to_name.get(synced.user_uri)
+        if name is not None:
+            booked_events[name].append((synced.start_time, synced.end_time, synced.is_long))
+    counts = count_long_events(events_by_uri)
+    booked_event_counts = {
+        user_uri_to_name[uri]: count for uri, count in counts.items() if uri in user_uri_to_name
+    }
+    return booked_event_counts, {name: sorted(events) for name, events in booked_events.items()}
+
+
+def fetch_all_team_availability(team_members, api_key, fetch_window=get_availability_window, on_error=logger.error,
+                                on_specialist=None, deadline_seconds=FETCH_DEADLINE_SECONDS, timezones=(pytz.UTC,),
+                                working_days=WORKING_DAYS_TO_CHECK, reconcile_interval_seconds=None):
+    """
+    Fetches availability (as scheduled (member, window) tasks) AND all scheduled
+    events (one org-wide scan) for the given members. Returns
+    a TeamData.
+    If given, `on_specialist(name, bookable_epochs)` is called as each member's
+    availability arrives (as an int64 epoch array), before the whole fetch completes.
+    Only the next `working_days` working days in `timezones` (every timezone the
+    result may be viewed in) are fetched.
+    The availability fan-out and the booked-events scan share one budget: the
+    caller's deadline if one is installed (e.g. a page render waiting on this
+    fetch), else `deadline_seconds` from now (None for no deadline). Members
+    whose windows failed or were cut off are listed as incomplete, while a
+    booked-events scan left without time keeps the last synced events, as for
+    any sync error.
+    `reconcile_interval_seconds` is passed on to sync_booked_events.
+    """
+    deadline = current_deadline() or (Deadline(deadline_seconds) if deadline_seconds else None)
+    now = datetime.now(pytz.UTC)
+    min_availability_time = get_minimum_booking_time(now)
+    availability_windows = plan_availability_windows(timezones, working_days, now)
+    api_scheduled_start, api_scheduled_end = get_scheduled_events_range(timezones, working_days, now)
+
+    booked_event_counts, booked_events = {}, {}
+
+    members_by_uri = defaultdict(list)
+    for member in team_members:
+        members_by_uri[member["soloEventUri"]].append(member)
+    slots_by_uri, incomplete_uris = {}, set()
+    with deadline_scope(deadline):
+        for uri, slots, complete in stream_event_type_slots(fetch_window, list(members_by_uri), availability_windows, api_key):
+            # Kept as compact epochs from here on; the datetimes are dropped as each member arrives
+            slots_by_uri[uri] = to_epochs(slot_time for slot_time in slots if slot_time >= min_availability_time)
+            if not complete:
+                incomplete_uris.add(uri)
+            if on_specialist is not None:
+                for member in members_by_uri[uri]:
+                    on_specialist(member["name"], slots_by_uri[uri])
+    # Assembled in member order, so the snapshot does not depend on completion order
+    availability_by_specialist = SlotTable.from_epochs({
+        member["name"]: slots_by_uri[member["soloEventUri"]]
+        for member in team_members if slots_by_uri.get(member["soloEventUri"])
+    })
+
+    with deadline_scope(deadline):
+        organization_uri = get_organization_uri(api_key, on_error=on_error)
+        if organization_uri:
+            events_by_uri = sync_booked_events(
+                organization_uri, api_scheduled_start, api_scheduled_end, api_key, on_error=on_error,
+                user_uris=[m['userUri'] for m in team_members], reconcile_interval_seconds=reconcile_interval_seconds,
+            )
+            booked_event_counts, booked_events = group_booked_events(events_by_uri, team_members)
+
+    incomplete_specialists = frozenset(m["name"] for m in team_members if m["soloEventUri"] in incomplete_uris)
+    return TeamData(availability_by_specialist, booked_event_counts, booked_events, incomplete_specialists)
+
+
+def get_affected_windows(start_time, end_time, now=None, timezones=(pytz.UTC,), working_days=WORKING_DAYS_TO_CHECK):
+    """The planned availability windows (as fetched by a refresh) overlapping [start_time, end_time)."""
+    return [
+        (window_start, window_end)
+        for window_start, window_end in plan_availability_windows(timezones, working_days, now)
+        if window_start < end_time and start_time < window_end
+    ]
+
+
+def apply_booking_change(team_data, scheduled_event, team_members, api_key, fetch_window=get_availability_window,
+                         on_error=logger.error, timezones=(pytz.UTC,), working_days=WORKING_DAYS_TO_CHECK):
+    """
+    Patches a fetch_all_team_availability() result for one booked or canceled
+    Calendly event without a full refetch: the host's booked count is updated
+    through the EventSyncs the last fetch used, and only the host's availability
+    windows overlapping the event are refetched. `fetch_window` must bypass any
+    cached result for those windows, and `timezones`/`working_days` must match
+    the fetch being patched. Returns the new (copied) team data.
+    """
+    availability_by_specialist, booked_event_counts, booked_events, incomplete_specialists = team_data
+    host_uris = {m.get("user") for m in scheduled_event.get("event_memberships") or []}
+    hosts = [m for m in team_members if m["userUri"] in host_uris]
+    if not hosts:
+        return team_data
+
+    now = datetime.now(pytz.UTC)
+    min_availability_time = get_minimum_booking_time(now)
+    try:
+        windows = get_affected_windows(
+            parse_calendly_time(scheduled_event["start_time"]), parse_calendly_time(scheduled_event["end_time"]), now,
+            timezones, working_days,
+        )
+    except (KeyError, TypeError, ValueError):
+        windows = []
+    if windows:
+        for member in hosts:
+            try:
+                refetched = [
+                    slot_time
+                    for window_start, window_end in windows
+                    for slot_time in fetch_window(member["soloEventUri"], window_start, window_end, api_key)
+                    if slot_time >= min_availability_time
+                ]
+            except requests.exceptions.RequestException as e:
+                # Keep the host's previous slots, but flag them until the next full refresh
+                logger.warning("Could not refetch availability for %s: %s", member["name"], e)
+                incomplete_specialists = incomplete_specialists | {member["name"]}
+                continue
+            kept = [
+                slot_time for slot_time in availability_by_specialist.datetimes(member["name"])
+                if not any(window_start <= slot_time < window_end for window_start, window_end in windows)
+            ]
+            availability_by_specialist = availability_by_specialist.replace(member["name"], kept + refetched)
+
+    booked_event_counts, booked_events = dict(booked_event_counts), dict(booked_events)
+    organization_uri = get_organization_uri(api_key, on_error=on_error)
+    if organization_uri:
+        # Update whichever syncs (org-wide or the hosts' own) the last fetch used
+        syncs = _team_syncs.get((organization_uri, api_key)) or [get_event_sync(organization_uri, api_key)]
+        for event_sync in syncs:
+            if event_sync.user_uri is None or event_sync.user_uri in host_uris:
+                event_sync.apply_change(scheduled_event)
+        host_counts, host_events = group_booked_events(merge_events(syncs), hosts)
+        for member in hosts:
+            booked_event_counts.pop(member["name"], None)
+            booked_events.pop(member["name"], None)
+        booked_event_counts.update(host_counts)
+        booked_events.update(host_events)
+
+    return TeamData(availability_by_specialist, booked_event_counts, booked_events, incomplete_specialists)
+
+
+def calculate_true_slots(date_times, slot_duration_minutes=SLOT_DURATION_MINUTES):
+    """Calculates non-overlapping slots."""
+    if not date_times: return 0
+    date_times.sort()
+    slot_duration = timedelta(minutes=slot_duration_minutes)
+    count = 0
+    last_booked_end_time = datetime.min.replace(tzinfo=pytz.UTC)
+    for start_time in date_times:
+        if start_time >= last_booked_end_time:
+            count += 1
+            last_booked_end_time = start_time + slot_duration
+    return count
+
+
+def get_next_working_days(n, timezone, now=None):
+    """Gets the next N working days."""
+    days = []
+    current_day = (now or datetime.now(pytz.UTC)).astimezone(timezone).date()
+    while len(days) < n:
+        if current_day.weekday() < 5:
+            days.append(current_day)
+        current_day += timedelta(days=1)
+    return days
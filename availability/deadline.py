@@ -0,0 +1,65 @@
+"""
+Deadline budgets.
+
+A Deadline is an absolute time budget for one operation, e.g. the snapshot
+fetch a page render is waiting on. It is installed for the current thread with
+deadline_scope() and read by CalendlyClient.get(), which caps each request's
+timeouts by the time left and refuses to start requests once it has passed.
+Being ambient, it passes through the cache layers without becoming part of
+their keys; worker pools carry it into their tasks with submit().
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+_local = threading.local()
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """Raised instead of starting a request once the operation's deadline has passed."""
+
+
+class Deadline:
+    """Expires `seconds` from now."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def check(self):
+        if self.expired():
+            raise DeadlineExceeded(f"Deadline of {self.seconds:g}s exceeded")
+
+
+def current_deadline():
+    """The Deadline installed for this thread, or None."""
+    return getattr(_local, "deadline", None)
+
+
+@contextmanager
+def deadline_scope(deadline):
+    """Installs `deadline` (None for no deadline) for this thread until the block exits."""
+    previous = current_deadline()
+    _local.deadline = deadline
+    try:
+        yield deadline
+    finally:
+        _local.deadline = previous
+
+
+def _run_with(deadline, fn, args):
+    with deadline_scope(deadline):
+        return fn(*args)
+
+
+def submit(executor, fn, *args):
+    """executor.submit(fn, *args), with the caller's deadline installed in the task."""
+    return executor.submit(_run_with, current_deadline(), fn, args)
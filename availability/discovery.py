@@ -0,0 +1,76 @@
+"""
+Organization discovery: every member of the organization and their solo event types.
+
+Per-user event-type fetches run concurrently on a bounded pool and rows are
+yielded as each user completes, so the UI can stream them into a table.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from availability.client import CALENDLY_API_BASE, MAX_CONCURRENT_REQUESTS, get_client
+from availability.deadline import submit
+from availability.metrics import METRICS
+
+
+def iter_pages(url, api_key, source):
+    """Yields the collection of every page, following pagination.next_page."""
+    client = get_client(api_key)
+    while url:
+        data = client.get(url).json()
+        yield data.get("collection", [])
+        url = data.get("pagination", {}).get("next_page")
+        if url:
+            METRICS.record_page(source)
+
+
+def list_organization_memberships(organization_uri, api_key):
+    """Returns all organization memberships. HTTP errors propagate."""
+    url = f"{CALENDLY_API_BASE}/organization_memberships?organization={organization_uri}&count=100"
+    return [membership for page in iter_pages(url, api_key, "organization_memberships") for membership in page]
+
+
+def list_solo_event_types(user_uri, api_key):
+    """Returns the 'solo' event types for one user. HTTP errors propagate."""
+    url = f"{CALENDLY_API_BASE}/event_types?user={user_uri}&count=50"
+    return [
+        {
+            "Event Type Name": event.get("name"),
+            "Event Type URI": event.get("uri"),
+            "Event Active": event.get("active", False)
+        }
+        for page in iter_pages(url, api_key, "event_types")
+        for event in page
+        if event.get("kind") == "solo"
+    ]
+
+
+def stream_discovery_rows(memberships, fetch_event_types, api_key, max_workers=MAX_CONCURRENT_REQUESTS):
+    """
+    Fetches event types for every member concurrently and yields
+    (users_done, users_total, rows) as each user completes.
+
+    `fetch_event_types(user_uri, membership_updated_at, api_key)` is called once per
+    user, so callers can cache it per membership version. A failure for one user
+    yields no rows for that user rather than aborting the report.
+    """
+    users = [m.get("user", {}) for m in memberships]
+    users = [(user, m.get("updated_at")) for user, m in zip(users, memberships) if user.get("uri")]
+    total = len(users)
+    if not total:
+        return
+
+    def fetch_rows(user, updated_at):
+        try:
+            events = fetch_event_types(user["uri"], updated_at, api_key)
+        except requests.exceptions.RequestException:
+            return []  # Skip one user's events (HTTP error or timeout)
+        return [
+            {"User Name": user.get("name"), "User Email": user.get("email"), "User URI": user["uri"], **event}
+            for event in events
+        ]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, total)) as executor:
+        futures = [submit(executor, fetch_rows, user, updated_at) for user, updated_at in users]
+        for done, future in enumerate(as_completed(futures), start=1):
+            yield done, total, future.result()
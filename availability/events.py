@@ -0,0 +1,328 @@
+"""
+Organization scheduled events, synced incrementally.
+
+An EventSync keeps the organization's active events by URI together with the
+per-user count of long (60+ minute) events. A refresh only fetches the days
+that entered the horizon since the last sync plus the events canceled inside
+the already-synced range; days that left the horizon are dropped locally.
+Calendly's list endpoint has no "updated since" filter, so new bookings inside
+the synced range are picked up by a full reconcile. Without webhooks that runs
+every RECONCILE_INTERVAL_SECONDS, i.e. on every 10-minute refresh; when
+webhooks push bookings through apply_event(), it only runs every
+PUSHED_RECONCILE_INTERVAL_SECONDS as a safety net and the refreshes in between
+are incremental. The canceled scan cannot be filtered by
+cancellation time either, so it pages through every canceled event in its
+range; it only covers the span of the events currently held, and is skipped
+when none are.
+
+An EventSync is scoped either to the whole organization or to one user; for a
+small team in a large organization, per-user syncs (run in parallel) fetch far
+fewer pages than an org-wide scan (see availability.core).
+
+Long listings are time-sharded: when a page says many more events follow, the
+rest of its range is split into shards that are paginated in parallel, and
+results are deduplicated by event URI so boundary events are never counted twice.
+"""
+import math
+import threading
+from collections import defaultdict, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+import pytz
+
+from availability.client import CALENDLY_API_BASE, MAX_CONCURRENT_REQUESTS, format_to_iso_z, get_client
+from availability.deadline import submit
+from availability.metrics import METRICS
+from availability.singleflight import SingleFlight
+from availability.store import get_store, make_key
+
+LONG_EVENT_MINUTES = 60
+RECONCILE_INTERVAL_SECONDS = 600 # No webhooks: reconcile on every app refresh
+PUSHED_RECONCILE_INTERVAL_SECONDS = 3600 # Webhooks apply bookings as they happen; several refreshes per reconcile
+EVENTS_PAGE_SIZE = 100
+MAX_SHARD_WORKERS = MAX_CONCURRENT_REQUESTS
+MIN_SHARD_SECONDS = 3600
+CANCELED_SCAN_SLACK = timedelta(seconds=1) # max_start_time is exclusive
+
+SyncedEvent = namedtuple("SyncedEvent", ["user_uri", "start_time", "is_long", "end_time"], defaults=[None])
+
+
+def parse_calendly_time(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _fetch_events_page(client, url, params):
+    """One scheduled_events request: (collection, next_page URL or None)."""
+    data = client.get(url, params=params).json()
+    return data.get("collection", []), data.get("pagination", {}).get("next_page")
+
+
+def plan_shards(page, shard_start, shard_end, max_shards=MAX_SHARD_WORKERS, min_shard_seconds=MIN_SHARD_SECONDS):
+    """
+    Splits what is left of [shard_start, shard_end) after a full first `page`
+    (sorted by start time) into shards, sized from the page's event density so
+    each is expected to need about one page. Returns [] when following the
+    page's next_page is expected to be as quick (little left, or no time span
+    to estimate from). The shards start at the page's last start time, so
+    events there are refetched and must be deduplicated by URI.
+    """
+    try:
+        last_start = parse_calendly_time(page[-1]["start_time"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return []
+    covered = (last_start - shard_start).total_seconds()
+    remaining = (shard_end - last_start).total_seconds()
+    if covered <= 0 or remaining <= 0:
+        return []
+    expected_pages = math.ceil(len(page) * remaining / covered / EVENTS_PAGE_SIZE)
+    pieces = min(expected_pages, max_shards, int(remaining // min_shard_seconds))
+    if pieces < 2:
+        return []
+    step = (shard_end - last_start) / pieces
+    bounds = [last_start + step * i for i in range(pieces)] + [shard_end]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def iter_sharded_event_pages(organization_uri, start_date, end_date, api_key, status='active', user_uri=None,
+                             max_workers=MAX_SHARD_WORKERS):
+    """
+    Yields each page of the organization's (or, with `user_uri`, one user's)
+    scheduled events starting in [start_date, end_date), adaptively
+    time-sharded: a range whose first page shows many more events to come is
+    split (plan_shards) and the shards are paginated in parallel on one bounded
+    pool, recursively. Pages arrive in
+    completion order and can overlap at shard boundaries; callers deduplicate by
+    URI. HTTP errors propagate as requests.HTTPError.
+    """
+    client = get_client(api_key)
+    url = f"{CALENDLY_API_BASE}/scheduled_events"
+    base_params = {'count': EVENTS_PAGE_SIZE, 'status': status, 'sort': 'start_time:asc'}
+    if user_uri:
+        base_params['user'] = user_uri
+    else:
+        base_params['organization'] = organization_uri
+
+    def shard_params(shard_start, shard_end):
+        return {**base_params, 'min_start_time': format_to_iso_z(shard_start), 'max_start_time': format_to_iso_z(shard_end)}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # future -> (shard start, shard end, first page of the shard?)
+        pending = {
+            submit(executor, _fetch_events_page, client, url, shard_params(start_date, end_date)): (start_date, end_date, True)
+        }
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    shard_start, shard_end, first = pending.pop(future)
+                    page, next_page = future.result()
+                    yield page
+                    if not next_page:
+                        continue
+                    shards = plan_shards(page, shard_start, shard_end) if first else []
+                    if shards:
+                        METRICS.record_event("scheduled_events.shard_split")
+                        for sub_start, sub_end in shards:
+                            pending[submit(
+                                executor, _fetch_events_page, client, url, shard_params(sub_start, sub_end)
+                            )] = (sub_start, sub_end, True)
+                    else:
+                        METRICS.record_page("scheduled_events")
+                        # next_page already carries the query string
+                        pending[submit(executor, _fetch_events_page, client, next_page, None)] = (shard_start, shard_end, False)
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def parse_event(event):
+    """Converts a raw Calendly event into a SyncedEvent, or None if it is malformed."""
+    try:
+        start_time = parse_calendly_time(event['start_time'])
+        end_time = parse_calendly_time(event['end_time'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    duration_minutes = (end_time - start_time).total_seconds() / 60
+    user_uri = (event.get("event_memberships") or [{}])[0].get("user")
+    return SyncedEvent(user_uri, start_time, duration_minutes >= LONG_EVENT_MINUTES, end_time)
+
+
+def count_long_events(events_by_uri):
+    """Counts long events per user URI."""
+    counts = defaultdict(int)
+    for synced in events_by_uri.values():
+        if synced.is_long and synced.user_uri:
+            counts[synced.user_uri] += 1
+    return counts
+
+
+def merge_events(syncs):
+    """{uri: SyncedEvent} across several syncs, each event once even if several syncs hold it."""
+    merged = {}
+    for event_sync in syncs:
+        merged.update(event_sync.events)
+    return merged
+
+
+class EventSync:
+    """Incrementally synced view of one organization's (or one user's) active scheduled events."""
+
+    def __init__(self, organization_uri, api_key, store=None,
+                 reconcile_interval_seconds=RECONCILE_INTERVAL_SECONDS, user_uri=None):
+        self.organization_uri = organization_uri
+        self.api_key = api_key
+        self.user_uri = user_uri
+        self.store = store
+        self.reconcile_interval_seconds = reconcile_interval_seconds
+        self.events = {}
+        self.counts = defaultdict(int)
+        self.synced_start = None
+        self.synced_end = None
+        self.last_reconcile = None
+        self.last_sync_requests = 0
+        self._lock = threading.Lock()
+        self._flight = SingleFlight("event_sync")
+        self._store_key = make_key(organization_uri, api_key) if user_uri is None else make_key(organization_uri, api_key, user_uri)
+        if store is not None:
+            self._load()
+
+    # --- In-place updates ---
+
+    def apply_event(self, event):
+        """Inserts, updates or (if canceled) removes a single raw Calendly event."""
+        uri = event.get("uri")
+        if not uri:
+            return
+        self._remove(uri)
+        if event.get("status", "active") == "canceled":
+            return
+        synced = parse_event(event)
+        if synced is not None:
+            self.events[uri] = synced
+            if synced.is_long and synced.user_uri:
+                self.counts[synced.user_uri] += 1
+
+    def apply_change(self, event):
+        """
+        Applies one pushed change (e.g. from a webhook) under the sync lock and
+        returns counts by user URI. Events outside the synced range are only removed.
+        """
+        with self._lock:
+            synced = parse_event(event)
+            if synced is not None and self.synced_start is not None and not (
+                self.synced_start <= synced.start_time < self.synced_end
+            ):
+                event = {**event, "status": "canceled"}
+            self.apply_event(event)
+            self._save()
+            return self.counts_by_user()
+
+    def _remove(self, uri):
+        synced = self.events.pop(uri, None)
+        if synced is not None and synced.is_long and synced.user_uri:
+            self.counts[synced.user_uri] -= 1
+            if self.counts[synced.user_uri] <= 0:
+                del self.counts[synced.user_uri]
+
+    # --- Sync ---
+
+    def _list(self, start_date, end_date, status='active'):
+        # Shards overlap at their boundaries, so keep each event URI once
+        events = {}
+        for page in iter_sharded_event_pages(
+            self.organization_uri, start_date, end_date, self.api_key, status, self.user_uri
+        ):
+            self.last_sync_requests += 1
+            for event in page:
+                if event.get("uri"):
+                    events[event["uri"]] = event
+        return list(events.values())
+
+    def sync(self, start_date, end_date):
+        """
+        Brings the synced range to [start_date, end_date) and returns counts by
+        user URI. Concurrent syncs of the same range share one run.
+        """
+        return self._flight.do((start_date, end_date), self._sync, start_date, end_date)
+
+    def _sync(self, start_date, end_date):
+        with self._lock:
+            now = datetime.now(pytz.UTC)
+            self.last_sync_requests = 0
+            needs_reconcile = (
+                self.synced_start is None
+                or self.last_reconcile is None
+                or (now - self.last_reconcile).total_seconds() >= self.reconcile_interval_seconds
+                or not (self.synced_start <= start_date <= self.synced_end)
+            )
+            if needs_reconcile:
+                events = self._list(start_date, end_date)
+                self.events, self.counts = {}, defaultdict(int)
+                for event in events:
+                    self.apply_event(event)
+                self.last_reconcile = now
+            else:
+                # Fetch everything first so a failed request leaves the state untouched
+                new_events = []
+                if end_date > self.synced_end:
+                    new_events = self._list(self.synced_end, end_date)
+                canceled = []
+                held = [synced.start_time for synced in self.events.values() if start_date <= synced.start_time < end_date]
+                if held:
+                    # Only cancellations of events we hold change anything
+                    canceled = self._list(min(held), min(max(held) + CANCELED_SCAN_SLACK, self.synced_end), status='canceled')
+                for uri, synced in list(self.events.items()):
+                    if not (start_date <= synced.start_time < end_date):
+                        self._remove(uri)
+                for event in new_events + canceled:
+                    self.apply_event(event)
+            self.synced_start, self.synced_end = start_date, end_date
+            self._save()
+            return self.counts_by_user()
+
+    def counts_by_user(self):
+        return defaultdict(int, self.counts)
+
+    # --- Persistence ---
+
+    def _save(self):
+        if self.store is None:
+            return
+        state = (self.events, self.synced_start, self.synced_end, self.last_reconcile)
+        self.store.put("event_sync", self._store_key, state, self.reconcile_interval_seconds)
+
+    def _load(self):
+        persisted = self.store.get("event_sync", self._store_key)
+        if persisted is None:
+            return
+        events, synced_start, synced_end, last_reconcile = persisted[0]
+        if any(synced.end_time is None for synced in events.values()):
+            return  # Saved before end times were kept; start with a full reconcile
+        self.synced_start, self.synced_end, self.last_reconcile = synced_start, synced_end, last_reconcile
+        for uri, synced in events.items():
+            self.events[uri] = synced
+            if synced.is_long and synced.user_uri:
+                self.counts[synced.user_uri] += 1
+
+
+_syncs = {}
+_syncs_lock = threading.Lock()
+
+
+def get_event_sync(organization_uri, api_key, user_uri=None, reconcile_interval_seconds=None):
+    """
+    Returns the process-wide EventSync for an organization (or one of its users),
+    creating it on first use. `reconcile_interval_seconds`, if given, replaces its
+    reconcile interval (default RECONCILE_INTERVAL_SECONDS).
+    """
+    with _syncs_lock:
+        key = (organization_uri, api_key, user_uri)
+        if key not in _syncs:
+            _syncs[key] = EventSync(
+                organization_uri, api_key, store=get_store(), user_uri=user_uri,
+                reconcile_interval_seconds=reconcile_interval_seconds or RECONCILE_INTERVAL_SECONDS,
+            )
+        elif reconcile_interval_seconds:
+            _syncs[key].reconcile_interval_seconds = reconcile_interval_seconds
+        return _syncs[key]
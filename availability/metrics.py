@@ -0,0 +1,216 @@
+"""
+Process-wide instrumentation for Calendly calls, caches and rendering.
+
+Every outbound request records its endpoint, status, latency and size; paging
+loops record pages followed; cached functions record hits and misses;
+coalesced fetches record how many callers joined an in-flight call; named
+timers record render time. METRICS.snapshot() returns all of it as a
+JSON-serialisable dict, and each request is also logged as one JSON line on
+the "availability.metrics" logger for scraping.
+"""
+import functools
+import json
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+logger = logging.getLogger("availability.metrics")
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000)
+LATENCY_BUCKET_LABELS = tuple(f"<={bound}ms" for bound in LATENCY_BUCKETS_MS) + (f">{LATENCY_BUCKETS_MS[-1]}ms",)
+
+
+def _bucket_label(ms):
+    for bound, label in zip(LATENCY_BUCKETS_MS, LATENCY_BUCKET_LABELS):
+        if ms <= bound:
+            return label
+    return LATENCY_BUCKET_LABELS[-1]
+
+
+class Metrics:
+    """Thread-safe counters and histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.requests = defaultdict(lambda: {
+                "count": 0, "seconds": 0.0, "max_ms": 0.0, "bytes": 0,
+                "status": Counter(), "latency_histogram": Counter(),
+            })
+            self.pages = Counter()
+            self.cache_calls = Counter()
+            self.cache_misses = Counter()
+            self.store = defaultdict(Counter)
+            self.timings = defaultdict(lambda: {"count": 0, "seconds": 0.0, "max_ms": 0.0})
+            self.events = Counter()
+            self.coalescing = defaultdict(Counter)
+            self.strategies = defaultdict(lambda: defaultdict(lambda: {"count": 0, "requests": 0, "seconds": 0.0}))
+            self.last_strategy = {}
+
+    def record_request(self, url, status, seconds, nbytes):
+        endpoint = urlparse(url).path or url
+        ms = seconds * 1000
+        with self._lock:
+            stats = self.requests[endpoint]
+            stats["count"] += 1
+            stats["seconds"] += seconds
+            stats["max_ms"] = max(stats["max_ms"], ms)
+            stats["bytes"] += nbytes
+            stats["status"][str(status)] += 1
+            stats["latency_histogram"][_bucket_label(ms)] += 1
+        logger.info(json.dumps({
+            "event": "calendly_request", "endpoint": endpoint, "status": status,
+            "latency_ms": round(ms, 1), "bytes": nbytes,
+        }))
+
+    def record_page(self, source):
+        """Records one pagination.next_page hop for a paging loop."""
+        with self._lock:
+            self.pages[source] += 1
+
+    def record_event(self, name):
+        """Counts one occurrence of a named event (e.g. a webhook delivery)."""
+        with self._lock:
+            self.events[name] += 1
+
+    def record_coalescing(self, name, joined):
+        """Counts one call to a coalesced fetch: it either ran the fetch or joined one in flight."""
+        with self._lock:
+            self.coalescing[name]["calls"] += 1
+            self.coalescing[name]["joined" if joined else "executions"] += 1
+
+    def record_cache_call(self, function):
+        with self._lock:
+            self.cache_calls[function] += 1
+
+    def record_cache_miss(self, function):
+        with self._lock:
+            self.cache_misses[function] += 1
+
+    def record_store(self, namespace, hit):
+        with self._lock:
+            self.store[namespace]["hits" if hit else "misses"] += 1
+
+    def record_timing(self, name, seconds):
+        with self._lock:
+            stats = self.timings[name]
+            stats["count"] += 1
+            stats["seconds"] += seconds
+            stats["max_ms"] = max(stats["max_ms"], seconds * 1000)
+
+    def record_strategy(self, name, strategy, requests, seconds, **details):
+        """Records which strategy a fetcher chose and what it cost, to tune its threshold."""
+        with self._lock:
+            stats = self.strategies[name][strategy]
+            stats["count"] += 1
+            stats["requests"] += requests
+            stats["seconds"] += seconds
+            self.last_strategy[name] = {"strategy": strategy, "requests": requests, "seconds": round(seconds, 4), **details}
+        logger.info(json.dumps({"event": "strategy", "name": name, **self.last_strategy[name]}))
+
+    @contextmanager
+    def timer(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_timing(name, time.perf_counter() - started)
+
+    def snapshot(self):
+        """Returns every metric as a JSON-serialisable dict."""
+        with self._lock:
+            requests = {
+                endpoint: {
+                    "count": s["count"],
+                    "mean_ms": round(s["seconds"] * 1000 / s["count"], 1) if s["count"] else 0.0,
+                    "max_ms": round(s["max_ms"], 1),
+                    "bytes": s["bytes"],
+                    "status": dict(s["status"]),
+                    "latency_histogram": dict(s["latency_histogram"]),
+                }
+                for endpoint, s in self.requests.items()
+            }
+            caches = {
+                function: {
+                    "calls": calls,
+                    "misses": self.cache_misses[function],
+                    "hits": max(calls - self.cache_misses[function], 0),
+                }
+                for function, calls in self.cache_calls.items()
+            }
+            return {
+                "since": self.started_at,
+                "requests": requests,
+                "pages_followed": dict(self.pages),
+                "caches": caches,
+                "store": {namespace: dict(counts) for namespace, counts in self.store.items()},
+                "events": dict(self.events),
+                "coalescing": {
+                    name: {"calls": c["calls"], "executions": c["executions"], "joined": c["joined"]}
+                    for name, c in self.coalescing.items()
+                },
+                "strategies": {
+                    name: {
+                        strategy: {
+                            "count": t["count"], "requests": t["requests"],
+                            "mean_requests": round(t["requests"] / t["count"], 1),
+                            "total_ms": round(t["seconds"] * 1000, 1),
+                        }
+                        for strategy, t in by_strategy.items()
+                    }
+                    for name, by_strategy in self.strategies.items()
+                },
+                "last_strategy": dict(self.last_strategy),
+                "timings": {
+                    name: {"count": t["count"], "total_ms": round(t["seconds"] * 1000, 1), "max_ms": round(t["max_ms"], 1)}
+                    for name, t in self.timings.items()
+                },
+            }
+
+
+METRICS = Metrics()
+
+
+def count_calls(name):
+    """Outer decorator for a cached function: counts every call."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            METRICS.record_cache_call(name)
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count_misses(name):
+    """Inner decorator for a cached function: the body only runs on a cache miss."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            METRICS.record_cache_miss(name)
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def instrumented_cache(cache_decorator):
+    """
+    Applies `cache_decorator` (e.g. st.cache_data(ttl=600)) to a function and
+    counts calls outside the cache and misses inside it, so hits = calls - misses.
+    The cache's clear() stays available on the returned function.
+    """
+    def decorator(fn):
+        cached = cache_decorator(count_misses(fn.__name__)(fn))
+        wrapper = count_calls(fn.__name__)(cached)
+        if hasattr(cached, "clear"):
+            wrapper.clear = cached.clear
+        return wrapper
+    return decorator
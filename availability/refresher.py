@@ -0,0 +1,111 @@
+"""
+Stale-while-revalidate snapshots.
+
+A SnapshotRefresher owns a background thread that re-runs a fetch function on
+a fixed interval and keeps the latest result. Readers get the current snapshot
+(and its age) immediately; they only wait on Calendly when no snapshot exists.
+Each snapshot is published as a new version of the refresher's SnapshotRegistry,
+so readers can hold the version they render while newer ones arrive. When
+given a SnapshotStore, the latest snapshot is also persisted so a restarted
+process starts from it instead of an empty state.
+"""
+import logging
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+import pytz
+
+from availability.metrics import METRICS
+from availability.snapshots import SnapshotRegistry
+
+logger = logging.getLogger(__name__)
+
+Snapshot = namedtuple("Snapshot", ["data", "fetched_at"])
+
+
+class SnapshotRefresher:
+    """Keeps the output of `fetch()` fresh in a background thread."""
+
+    def __init__(self, fetch, interval_seconds, name="snapshot", store=None, store_ttl_seconds=None, validate=None):
+        self.fetch = fetch
+        self.interval_seconds = interval_seconds
+        self.name = name
+        self.store = store
+        self.store_ttl_seconds = store_ttl_seconds or interval_seconds
+        self.registry = SnapshotRegistry(name)
+        if store is not None:
+            persisted = store.get("snapshot", name)
+            # A snapshot persisted in an older data format is ignored
+            if persisted is not None and (validate is None or validate(persisted[0])):
+                self.registry.publish(Snapshot(*persisted))
+        self._refresh_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts the background refresh loop (idempotent)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"refresher-{self.name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def latest(self):
+        """Returns the most recent Snapshot without blocking, or None if none exists yet."""
+        return self.registry.latest()
+
+    def get(self):
+        """Returns the latest Snapshot, fetching synchronously only if none exists yet."""
+        snapshot = self.latest()
+        if snapshot is not None:
+            return snapshot
+        with self._refresh_lock:
+            # The background thread may have finished a refresh while we waited
+            if self.latest() is None:
+                with METRICS.timer(f"refresh.{self.name}"):
+                    self._store(self.fetch())
+            return self.latest()
+
+    def refresh(self):
+        """Fetches a new snapshot now and replaces the current one."""
+        with self._refresh_lock, METRICS.timer(f"refresh.{self.name}"):
+            return self._store(self.fetch())
+
+    def patch(self, update):
+        """
+        Replaces the current snapshot with `update(data)` without a full fetch, e.g.
+        for a pushed booking change. Does nothing (and returns None) if no snapshot exists yet.
+        """
+        with self._refresh_lock:
+            snapshot = self.latest()
+            if snapshot is None:
+                return None
+            return self._store(update(snapshot.data))
+
+    def age_seconds(self):
+        snapshot = self.latest()
+        if snapshot is None:
+            return None
+        return (datetime.now(pytz.UTC) - snapshot.fetched_at).total_seconds()
+
+    def _store(self, data):
+        snapshot = Snapshot(data, datetime.now(pytz.UTC))
+        self.registry.publish(snapshot)
+        if self.store is not None:
+            self.store.put("snapshot", self.name, data, self.store_ttl_seconds, fetched_at=snapshot.fetched_at)
+        return snapshot
+
+    def _run(self):
+        # A snapshot warmed from the store is only refreshed once it is due
+        age = self.age_seconds()
+        delay = 0 if age is None else max(self.interval_seconds - age, 0)
+        while not self._stopped.wait(delay):
+            try:
+                self.refresh()
+            except Exception:
+                # Keep serving the previous snapshot; try again next interval
+                logger.exception("Background refresh failed for %s", self.name)
+            delay = self.interval_seconds
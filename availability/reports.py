@@ -0,0 +1,91 @@
+"""
+Admin report tables.
+
+Projects a fetched availability snapshot onto one team and timezone and builds
+the language summary, capacity heatmap and booked appointments report shown in
+the admin view and written by the batch CLI. The heatmap and booked report are
+queries on the interval UtilizationIndex. Pure presentation: no API calls.
+"""
+from collections import namedtuple
+
+import pandas as pd
+
+from availability.core import SLOT_DURATION_MINUTES, get_minimum_booking_time
+from availability.slot_index import SlotIndex
+from availability.utilization import UtilizationIndex, local_day_bounds
+
+# File names match the admin view's CSV downloads
+REPORT_FILE_NAMES = {
+    "summary": "language_summary.csv",
+    "heatmap": "team_capacity_heatmap.csv",
+    "report": "booked_appointments_report.csv",
+}
+
+AdminTables = namedtuple("AdminTables", ["summary", "heatmap", "report"])
+
+
+def build_slot_index(slot_table, team_members, timezone, working_days, now=None):
+    """
+    Builds the SlotIndex for one team: keeps only its members' slots (from a
+    SlotTable) and applies the MINIMUM_NOTICE_HOURS cut-off relative to `now`.
+    """
+    bookable_slots = slot_table.select([m["name"] for m in team_members], since=get_minimum_booking_time(now))
+    return SlotIndex(bookable_slots, team_members, timezone, working_days, SLOT_DURATION_MINUTES)
+
+
+def build_utilization_index(team_data, team_members, now=None):
+    """
+    Builds the UtilizationIndex for one team: its members' bookable slots (after
+    the MINIMUM_NOTICE_HOURS cut-off) and booked intervals.
+    """
+    names = [m["name"] for m in team_members]
+    available = team_data.availability_by_specialist.select(names, since=get_minimum_booking_time(now))
+    booked = {name: team_data.booked_events[name] for name in names if name in team_data.booked_events}
+    return UtilizationIndex(booked, available, SLOT_DURATION_MINUTES)
+
+
+def build_admin_tables(utilization, active_team_members, languages, timezone, working_days):
+    """
+    Builds the language summary, capacity heatmap and booked report tables from
+    the team's UtilizationIndex, per local working day of `timezone`.
+    """
+    day_labels = [day.strftime('%a %d/%m') for day in working_days]
+    day_starts, day_ends = local_day_bounds(timezone, working_days)
+    specialist_names = sorted(m['name'] for m in active_team_members)
+
+    # --- 1. Team Capacity Heatmap ---
+    # Like the main view, only specialists with a working-day slot get a row
+    heatmap_rows = {
+        name: utilization.free_slots(name, day_starts, day_ends)
+        for name in specialist_names
+        if utilization.available_count(name, day_starts, day_ends).any()
+    }
+    heatmap_df = pd.DataFrame.from_dict(heatmap_rows, orient="index", columns=day_labels).astype("int64")
+    heatmap_df.index.name = "Specialist"
+
+    # --- 2. Language Summary ---
+    summary_data = []
+    for lang in languages:
+        speakers = [m['name'] for m in active_team_members if lang in m['languages'] and m['name'] in heatmap_rows]
+        day_totals = heatmap_df.loc[speakers].sum() if speakers else pd.Series(0, index=day_labels)
+        summary_data.append({"Language": lang, **day_totals.to_dict()})
+    summary_df = pd.DataFrame(summary_data, columns=["Language"] + day_labels).set_index("Language")
+
+    # --- 3. Booked Appointments Report ---
+    # Like the other columns, counts cover only the working days shown
+    report_data = []
+    for name in specialist_names:
+        booked_hours = utilization.booked_seconds(name, day_starts, day_ends).sum() / 3600
+        free_hours = utilization.free_seconds(name, day_starts, day_ends).sum() / 3600
+        capacity = booked_hours + free_hours
+        report_data.append({
+            "Specialist": name,
+            "Booked Appointments (60+ min)": int(utilization.long_event_count(name, day_starts, day_ends).sum()),
+            "Booked Hours": round(booked_hours, 1),
+            "Free Hours": round(free_hours, 1),
+            "Utilization (%)": round(100 * booked_hours / capacity) if capacity else 0,
+        })
+    report_df = pd.DataFrame(
+        report_data, columns=["Specialist", "Booked Appointments (60+ min)", "Booked Hours", "Free Hours", "Utilization (%)"]
+    ).set_index("Specialist")
+    return AdminTables(summary_df, heatmap_df, report_df)
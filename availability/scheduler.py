@@ -0,0 +1,161 @@
+"""
+Global fetch scheduler.
+
+Availability is fetched as independent (event type, window) tasks on a single
+bounded worker pool, so wall time is close to one round trip regardless of how
+many members or windows there are, and the thread count stays capped.
+Results can also be streamed per event type as soon as all of its windows are
+in, so one slow or rate-limited member does not hold up the others. The
+windows themselves are planned by plan_windows() to cover only the time that
+will be displayed, in as few requests as possible. A window that fails, or is
+still out when the caller's deadline passes, marks its event type's slots
+incomplete instead of silently shortening them.
+"""
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
+from datetime import timedelta
+
+from availability.client import MAX_CONCURRENT_REQUESTS
+from availability.deadline import current_deadline, submit
+from availability.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+MAX_FETCH_WORKERS = MAX_CONCURRENT_REQUESTS
+QUERY_WINDOW_DAYS = 7  # Calendly's maximum range for event_type_available_times
+
+# slots: those of the windows that were fetched; complete: False if any window failed or timed out
+EventTypeSlots = namedtuple("EventTypeSlots", ["uri", "slots", "complete"])
+
+
+def split_windows(start_date, end_date, window_days=QUERY_WINDOW_DAYS):
+    """Splits [start_date, end_date) into consecutive windows of at most `window_days`."""
+    windows = []
+    window_start = start_date
+    while window_start < end_date:
+        window_end = min(window_start + timedelta(days=window_days), end_date)
+        windows.append((window_start, window_end))
+        window_start = window_end
+    return windows
+
+
+def plan_windows(ranges, window_days=QUERY_WINDOW_DAYS):
+    """
+    Plans the fewest query windows of at most `window_days` that cover every
+    [start, end) in `ranges`. Where it takes no extra windows, they are split at
+    the gaps between ranges (e.g. weekends), fetching the least time and starting
+    at range starts, so they stay stable as the ranges do.
+    """
+    merged = []
+    for start, end in sorted(r for r in ranges if r[0] < r[1]):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    max_span = timedelta(days=window_days)
+
+    # Greedy from the earliest uncovered point: the fewest windows, possibly splitting a range
+    greedy, i = [], 0
+    point = merged[0][0] if merged else None
+    while i < len(merged):
+        window_start = max(point, merged[i][0])
+        limit = window_start + max_span
+        j = i
+        while j + 1 < len(merged) and merged[j + 1][0] < limit:
+            j += 1
+        point = min(merged[j][1], limit)
+        greedy.append((window_start, point))
+        i = j if merged[j][1] > point else j + 1
+
+    # Windows made of whole ranges (longer ones pre-split), by (window count, fetched time)
+    pieces = [piece for start, end in merged for piece in split_windows(start, end, window_days)]
+    best = [(0, timedelta(0), [])]
+    for i in range(1, len(pieces) + 1):
+        options = []
+        for j in range(i, 0, -1):
+            window = (pieces[j - 1][0], pieces[i - 1][1])
+            if window[1] - window[0] > max_span:
+                break
+            count, fetched, windows = best[j - 1]
+            options.append((count + 1, fetched + (window[1] - window[0]), windows + [window]))
+        best.append(min(options, key=lambda option: option[:2]))
+    aligned = best[-1][2]
+    return aligned if len(aligned) <= len(greedy) else greedy
+
+
+def run_tasks(fn, tasks, max_workers=MAX_FETCH_WORKERS):
+    """Runs fn(*task) for every task on one bounded pool and returns results in task order."""
+    if not tasks:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+        return [future.result() for future in [submit(executor, fn, *task) for task in tasks]]
+
+
+def stream_event_type_slots(fetch_window, event_type_uris, windows, api_key):
+    """
+    Yields an EventTypeSlots for every event type over the (start, end) `windows`
+    (e.g. from plan_windows) in completion order, each as soon as all of its
+    windows are in.
+
+    `fetch_window(event_type_uri, window_start, window_end, api_key)` is called
+    once per (event type, window) task on one bounded pool, under the caller's
+    deadline; each event type's slots are stitched back together in window
+    order. When the deadline passes, the event types still waiting on a window
+    are yielded at once as incomplete and their outstanding tasks abandoned.
+    """
+    unique_uris = list(dict.fromkeys(event_type_uris))
+    if not unique_uris or not windows:
+        for uri in unique_uris:
+            yield EventTypeSlots(uri, [], True)
+        return
+
+    results = {uri: [None] * len(windows) for uri in unique_uris}
+    remaining = {uri: len(windows) for uri in unique_uris}
+    complete = dict.fromkeys(unique_uris, True)
+
+    def finish(uri):
+        slots = [slot for window_slots in results.pop(uri) if window_slots for slot in window_slots]
+        return EventTypeSlots(uri, slots, complete[uri])
+
+    tasks = [(uri, i, ws, we) for uri in unique_uris for i, (ws, we) in enumerate(windows)]
+    deadline = current_deadline()
+    executor = ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(tasks)))
+    try:
+        futures = {
+            submit(executor, fetch_window, uri, ws, we, api_key): (uri, i)
+            for uri, i, ws, we in tasks
+        }
+        try:
+            for future in as_completed(futures, timeout=deadline.remaining() if deadline is not None else None):
+                uri, i = futures[future]
+                try:
+                    results[uri][i] = future.result()
+                except Exception as e:
+                    complete[uri] = False
+                    METRICS.record_event("availability_window.failed")
+                    logger.warning("Availability window %s for %s failed: %s", windows[i][0].date(), uri, e)
+                remaining[uri] -= 1
+                if remaining[uri] == 0:
+                    yield finish(uri)
+        except FutureTimeout:
+            METRICS.record_event("availability_window.deadline_exceeded")
+            logger.warning("Deadline passed with %d event types still fetching", len(results))
+            for uri in list(results):
+                complete[uri] = False
+                yield finish(uri)
+    finally:
+        # Abandoned tasks finish on their own (every request has a timeout); do not wait for them
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def fetch_event_type_slots(fetch_window, event_type_uris, windows, api_key):
+    """
+    Fetches slots for every event type over the `windows` and returns
+    {event_type_uri: [slots]} once all of them are in (see stream_event_type_slots).
+    Incomplete event types keep the slots of the windows that were fetched.
+    """
+    slots_by_uri = {uri: [] for uri in dict.fromkeys(event_type_uris)}
+    for uri, slots, _ in stream_event_type_slots(fetch_window, event_type_uris, windows, api_key):
+        slots_by_uri[uri] = slots
+    return slots_by_uri
@@ -0,0 +1,72 @@
+"""
+Single-flight request coalescing.
+
+When several sessions miss the same cache key at the same moment (e.g. many
+admins opening the dashboard just after a TTL expires), only the first caller
+runs the fetch; the others wait for and share its result, or its exception.
+Every call is counted in METRICS, so N simultaneous callers can be checked to
+produce one set of API calls. Only in-flight calls are shared; nothing is cached.
+"""
+import functools
+import threading
+
+from availability.metrics import METRICS
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers for that key join it."""
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """Returns fn(*args, **kwargs), or the result of an identical call already in flight."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        METRICS.record_coalescing(self.name, joined=not leader)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+def coalesced(name):
+    """Decorator: concurrent calls with equal arguments share one execution (see SingleFlight)."""
+    def decorator(fn):
+        flight = SingleFlight(name)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                key = repr(key)
+            return flight.do(key, fn, *args, **kwargs)
+        return wrapper
+    return decorator
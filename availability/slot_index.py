@@ -0,0 +1,51 @@
+"""
+Per-specialist, per-day slot index shared by every view.
+
+A SlotIndex is built once per (snapshot, timezone): it buckets every slot into
+local working days, sorts them, precomputes true-slot counts and keeps a
+name -> member lookup, so the main view and all admin tables read from the
+same structure instead of re-bucketing the raw slots.
+"""
+from collections import defaultdict
+
+from availability.aggregation import aggregate_slots
+
+
+class SlotIndex:
+    """specialist -> local day -> sorted 'HH:MM' slot times, with true-slot counts."""
+
+    def __init__(self, slot_table, members, timezone, working_days, slot_duration_minutes):
+        aggregate = aggregate_slots(slot_table, timezone, working_days, slot_duration_minutes)
+        self.timezone = timezone
+        self.working_days = list(working_days)
+        self.members_by_name = {m["name"]: m for m in members}
+        # DataFrame (specialist x working day) of true (non-overlapping) slots
+        self.day_counts = aggregate.day_counts
+        self.slots = defaultdict(dict)
+        for (specialist, day), times in aggregate.slots.groupby(["specialist", "day"], sort=False)["time"]:
+            self.slots[specialist][day] = times.tolist()
+        self._speakers = {}
+
+    def member(self, name):
+        return self.members_by_name.get(name)
+
+    def speakers(self, language):
+        """Specialists with at least one working-day slot who speak `language`."""
+        if language not in self._speakers:
+            self._speakers[language] = [
+                name for name in self.day_counts.index
+                if language in self.members_by_name.get(name, {}).get("languages", [])
+            ]
+        return self._speakers[language]
+
+    def language_day_counts(self, language):
+        """Total true slots per working day across the speakers of `language`."""
+        return self.day_counts.loc[self.speakers(language)].sum()
+
+    def language_times(self, language):
+        """{day: sorted unique slot times} across the speakers of `language`, working days only."""
+        times_by_day = defaultdict(set)
+        for name in self.speakers(language):
+            for day, times in self.slots[name].items():
+                times_by_day[day].update(times)
+        return {day: sorted(times_by_day[day]) for day in self.working_days if day in times_by_day}
@@ -0,0 +1,100 @@
+"""
+Compact slot storage.
+
+A SlotTable holds the slot start times of many specialists as one int64 array
+of UTC epoch seconds, grouped by specialist and sorted within each group, plus
+the offsets where each specialist's group starts (so a slot's specialist code
+is its group index). That is 8 bytes per slot instead of a tz-aware datetime
+(plus a dict and list entry) per slot. It pickles as three flat buffers, and
+NumPy can view the array without copying (np.frombuffer). Stdlib only, so the
+headless core can use it without pandas/NumPy.
+"""
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+
+import pytz
+
+
+def _epoch(slot_time):
+    return int(slot_time.timestamp())
+
+
+def to_epochs(slot_times):
+    """Sorted int64 epoch seconds (array('q')) of tz-aware datetimes."""
+    return array("q", sorted(_epoch(dt) for dt in slot_times))
+
+
+class SlotTable:
+    """Immutable {specialist: sorted slot start epochs} backed by flat int64 arrays."""
+
+    __slots__ = ("names", "epochs", "offsets", "_positions")
+
+    def __init__(self, names=(), epochs=None, offsets=None):
+        """`epochs` (array('q')) holds each name's sorted slots back to back; `offsets` has len(names) + 1 entries."""
+        self.names = tuple(names)
+        self.epochs = epochs if epochs is not None else array("q")
+        self.offsets = offsets if offsets is not None else array("q", [0] * (len(self.names) + 1))
+        self._positions = {name: i for i, name in enumerate(self.names)}
+
+    @classmethod
+    def from_epochs(cls, epochs_by_specialist):
+        """Builds a table from {name: iterable of epoch seconds}, keeping the mapping's name order."""
+        names, epochs, offsets = [], array("q"), array("q", [0])
+        for name, slot_epochs in epochs_by_specialist.items():
+            names.append(name)
+            epochs.extend(sorted(slot_epochs))
+            offsets.append(len(epochs))
+        return cls(names, epochs, offsets)
+
+    @classmethod
+    def from_datetimes(cls, slots_by_specialist):
+        """Builds a table from {name: iterable of tz-aware datetimes}."""
+        return cls.from_epochs({name: [_epoch(dt) for dt in slots] for name, slots in slots_by_specialist.items()})
+
+    def __reduce__(self):
+        return SlotTable, (self.names, self.epochs, self.offsets)
+
+    def __len__(self):
+        """Total number of slots."""
+        return len(self.epochs)
+
+    def __contains__(self, name):
+        return name in self._positions
+
+    def count(self, name):
+        """Number of slots for `name` (0 if absent)."""
+        i = self._positions.get(name)
+        return 0 if i is None else self.offsets[i + 1] - self.offsets[i]
+
+    def epochs_for(self, name):
+        """`name`'s sorted slot epochs (a copy; empty if absent)."""
+        i = self._positions.get(name)
+        return array("q") if i is None else self.epochs[self.offsets[i]:self.offsets[i + 1]]
+
+    def datetimes(self, name):
+        """`name`'s slots as tz-aware UTC datetimes, for display and patching."""
+        return [datetime.fromtimestamp(epoch, pytz.UTC) for epoch in self.epochs_for(name)]
+
+    def select(self, names, since=None):
+        """
+        A table of just `names` (in that order, skipping absent ones), keeping
+        only slots starting at or after the `since` datetime if given.
+        """
+        cutoff = _epoch(since) if since is not None else None
+        selected = {}
+        for name in names:
+            i = self._positions.get(name)
+            if i is None or name in selected:
+                continue
+            start, end = self.offsets[i], self.offsets[i + 1]
+            if cutoff is not None:
+                start = bisect_left(self.epochs, cutoff, start, end)
+            selected[name] = self.epochs[start:end]
+        return SlotTable.from_epochs(selected)
+
+    def replace(self, name, slots):
+        """A copy with `name`'s slots (tz-aware datetimes) replaced; `name` is appended if absent."""
+        epochs_by_specialist = {n: self.epochs_for(n) for n in self.names}
+        epochs_by_specialist[name] = [_epoch(dt) for dt in slots]
+        return SlotTable.from_epochs(epochs_by_specialist)
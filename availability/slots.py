@@ -0,0 +1,25 @@
+"""Calendly event_type_available_times: bookable start times for one event type."""
+from datetime import datetime
+
+from availability.client import CALENDLY_API_BASE, HEDGE_AFTER_SECONDS, format_to_iso_z, get_client
+
+
+def list_available_times(event_type_uri, window_start, window_end, api_key):
+    """
+    Returns the available slot start times (tz-aware UTC datetimes) for one event
+    type within a single window of at most 7 days. HTTP errors and timeouts
+    propagate. A slow response is hedged (see CalendlyClient.get).
+    """
+    params = {
+        'event_type': event_type_uri,
+        'start_time': format_to_iso_z(window_start),
+        'end_time': format_to_iso_z(window_end)
+    }
+    data = get_client(api_key).get(
+        f"{CALENDLY_API_BASE}/event_type_available_times", params=params, hedge_after=HEDGE_AFTER_SECONDS
+    ).json()
+    return [
+        datetime.fromisoformat(slot["start_time"].replace('Z', '+00:00'))
+        for slot in data.get("collection", [])
+        if slot.get("status") == "available"
+    ]
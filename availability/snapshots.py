@@ -0,0 +1,159 @@
+"""
+Versioned, read-only snapshot registry.
+
+One process-wide registry holds each published version of a shared result
+(e.g. the team snapshot) and everything derived from it (slot indexes, admin
+tables), so every session reads the same objects instead of keeping its own
+copies. A session holds only a SnapshotRef to the version it is showing. A
+version that is no longer the latest is evicted, with its derived values, once
+no reference to it is left; a reference is released explicitly or when it is
+garbage collected with its session, so a closed browser tab frees its version.
+Published values are shared, so they must be treated as read-only: an update
+is published as a new version.
+"""
+import threading
+import weakref
+from collections import Counter, deque
+
+from availability.metrics import METRICS
+from availability.singleflight import SingleFlight
+
+
+class SnapshotRef:
+    """A hold on one version of a registry; `value` stays readable until release()."""
+
+    __slots__ = ("version", "value", "_finalizer", "__weakref__")
+
+    def __init__(self, registry, version, value):
+        self.version = version
+        self.value = value
+        self._finalizer = weakref.finalize(self, registry._release, version)
+
+    def release(self):
+        """Drops the hold (idempotent); the version may then be evicted."""
+        self._finalizer()
+
+
+class SnapshotRegistry:
+    """Published versions of one shared value, kept while they are the latest or referenced."""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._values = {}
+        self._derived = {}
+        self._references = Counter()
+        # Versions whose references were dropped, applied under the lock (a finalizer may run while it is held)
+        self._released = deque()
+        self._latest_version = None
+        self._next_version = 1
+        self._flight = SingleFlight(f"{name}.derive")
+
+    @property
+    def latest_version(self):
+        return self._latest_version
+
+    def latest(self):
+        """The latest published value, or None if nothing was published yet."""
+        with self._lock:
+            self._apply_releases()
+            return self._values.get(self._latest_version)
+
+    def publish(self, value):
+        """Adds `value` as the latest version and returns its number; the previous latest is evicted if unreferenced."""
+        with self._lock:
+            self._apply_releases()
+            return self._publish(value)
+
+    def acquire_or_publish(self, value, seen_version):
+        """
+        Returns a SnapshotRef to the latest version if one was published after
+        `seen_version` (e.g. by a concurrent session doing the same work),
+        otherwise publishes `value` and returns a SnapshotRef to it.
+        """
+        with self._lock:
+            self._apply_releases()
+            if self._latest_version != seen_version:
+                version = self._latest_version
+                value = self._values[version]
+            else:
+                version = self._publish(value)
+            self._references[version] += 1
+            return SnapshotRef(self, version, value)
+
+    def acquire(self, version=None):
+        """Returns a SnapshotRef holding `version` (default: the latest). KeyError if it was evicted."""
+        with self._lock:
+            self._apply_releases()
+            version = self._latest_version if version is None else version
+            if version not in self._values:
+                raise KeyError(f"{self.name} version {version} is not available")
+            self._references[version] += 1
+            return SnapshotRef(self, version, self._values[version])
+
+    def derive(self, version, key, fn, *args):
+        """
+        Returns fn(*args), computed once per (version, key) and kept until the
+        version is evicted. `key` is a tuple starting with a name, under which
+        calls and builds are counted as cache calls and misses.
+        """
+        METRICS.record_cache_call(key[0])
+        with self._lock:
+            derived = self._derived.get(version)
+            if derived is not None and key in derived:
+                return derived[key]
+
+        def build():
+            METRICS.record_cache_miss(key[0])
+            value = fn(*args)
+            with self._lock:
+                if version in self._derived:
+                    self._derived[version][key] = value
+            return value
+
+        return self._flight.do((version, key), build)
+
+    def stats(self):
+        """Live versions, references and derived values, e.g. for the instrumentation panel."""
+        with self._lock:
+            self._apply_releases()
+            return {
+                "latest_version": self._latest_version,
+                "versions": len(self._values),
+                "references": sum(self._references.values()),
+                "derived": sum(len(derived) for derived in self._derived.values()),
+            }
+
+    def _publish(self, value):
+        # Called with the lock held
+        version, previous = self._next_version, self._latest_version
+        self._next_version += 1
+        self._values[version], self._derived[version] = value, {}
+        self._latest_version = version
+        if previous is not None:
+            self._evict_if_unused(previous)
+        return version
+
+    def _release(self, version):
+        self._released.append(version)
+        # Never blocks, so a finalizer run by garbage collection inside a locked section cannot deadlock
+        if self._lock.acquire(blocking=False):
+            try:
+                self._apply_releases()
+            finally:
+                self._lock.release()
+
+    def _apply_releases(self):
+        # Called with the lock held
+        while self._released:
+            version = self._released.popleft()
+            self._references[version] -= 1
+            if self._references[version] <= 0:
+                del self._references[version]
+                self._evict_if_unused(version)
+
+    def _evict_if_unused(self, version):
+        # Called with the lock held
+        if version != self._latest_version and not self._references[version] and version in self._values:
+            del self._values[version], self._derived[version]
+            METRICS.record_event(f"{self.name}.version_evicted")
@@ -0,0 +1,131 @@
+"""
+Persistent local snapshot store.
+
+Fetched Calendly data is written to a SQLite file with its fetch time and an
+expiry, so a redeploy or worker restart warms from disk instead of sending a
+burst of API calls. SQLite is the only dependency.
+"""
+import functools
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import pytz
+
+from availability.metrics import METRICS
+from availability.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.environ.get("AVAILABILITY_DB_PATH", ".availability_cache.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace  TEXT NOT NULL,
+    key        TEXT NOT NULL,
+    value      BLOB NOT NULL,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+)
+"""
+
+
+class SnapshotStore:
+    """A small TTL key/value store on top of SQLite, safe to share between threads."""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(_SCHEMA)
+
+    def get(self, namespace, key):
+        """Returns (value, fetched_at) for an unexpired entry, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, fetched_at FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            value = pickle.loads(row[0])
+        except Exception:
+            # Written by an older version in a format that no longer loads; treat as a miss
+            logger.warning("Ignoring unreadable %s entry in the store", namespace)
+            return None
+        return value, datetime.fromtimestamp(row[1], pytz.UTC)
+
+    def put(self, namespace, key, value, ttl_seconds, fetched_at=None):
+        fetched_ts = fetched_at.timestamp() if fetched_at else time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, pickle.dumps(value), fetched_ts, fetched_ts + ttl_seconds),
+            )
+
+    def delete(self, namespace, key):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def purge_expired(self):
+        """Deletes expired entries and returns how many were removed."""
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),)).rowcount
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Returns the process-wide SnapshotStore, opening it (and purging expired rows) on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SnapshotStore()
+            _store.purge_expired()
+        return _store
+
+
+def make_key(*args):
+    """Hashes call arguments into a stable key (so API keys are never stored in clear)."""
+    return hashlib.sha256(repr(args).encode("utf-8")).hexdigest()
+
+
+def persisted(namespace, ttl_seconds):
+    """
+    Decorator that reads through the SnapshotStore before calling the function
+    and writes non-None results back with `ttl_seconds` expiry. Concurrent
+    calls with the same arguments are coalesced into one read-through. The
+    wrapped function gets an `invalidate(*args)` to drop one call's stored result.
+    """
+    def decorator(fn):
+        flight = SingleFlight(f"store: {namespace}")
+
+        def read_through(store, key, args):
+            cached = store.get(namespace, key)
+            METRICS.record_store(namespace, hit=cached is not None)
+            if cached is not None:
+                return cached[0]
+            result = fn(*args)
+            if result is not None:
+                store.put(namespace, key, result, ttl_seconds)
+            return result
+
+        @functools.wraps(fn)
+        def wrapper(*args):
+            key = make_key(*args)
+            return flight.do(key, read_through, get_store(), key, args)
+
+        wrapper.invalidate = lambda *args: get_store().delete(namespace, make_key(*args))
+        return wrapper
+    return decorator
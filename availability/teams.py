@@ -0,0 +1,93 @@
+"""
+Config-driven team registry.
+
+Teams, their members, languages and timezone options are loaded from a JSON
+config file (teams.json by default, or TEAMS_CONFIG_PATH), so one deployment
+can serve every region. The registry lists each active member once across
+teams, so a member shared by several teams is fetched once.
+"""
+import json
+import os
+from collections import namedtuple
+
+DEFAULT_CONFIG_PATH = os.environ.get(
+    "TEAMS_CONFIG_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "teams.json")
+)
+
+Team = namedtuple("Team", ["name", "title", "languages", "timezones", "default_timezone", "members"])
+
+
+class TeamRegistry:
+    """All configured teams, with member names checked for consistent Calendly URIs across teams."""
+
+    def __init__(self, teams):
+        self.teams = {team.name: team for team in teams}
+        members_by_name = {}
+        for team in teams:
+            for member in team.members:
+                existing = members_by_name.get(member["name"])
+                if existing is not None and (existing["userUri"], existing["soloEventUri"]) != (member["userUri"], member["soloEventUri"]):
+                    raise ValueError(f"Member name '{member['name']}' is configured with different Calendly URIs")
+                members_by_name[member["name"]] = member
+
+    @property
+    def team_names(self):
+        return list(self.teams)
+
+    def team(self, name):
+        return self.teams[name]
+
+    def active_members(self, team_name):
+        """Active members of one team with both Calendly URIs configured."""
+        return [
+            m for m in self.teams[team_name].members
+            if m["active"] and m["userUri"] and m["soloEventUri"]
+        ]
+
+    def all_active_members(self, team_names=None):
+        """Active members across every team (or just `team_names`), each listed once even if they belong to several teams."""
+        unique = {}
+        for team_name in team_names or self.teams:
+            for member in self.active_members(team_name):
+                unique.setdefault(member["name"], member)
+        return list(unique.values())
+
+    def timezone_names(self, team_names=None):
+        """IANA names of every timezone offered by all teams (or just `team_names`), each listed once."""
+        return list(dict.fromkeys(
+            timezone for team_name in team_names or self.teams for timezone in self.teams[team_name].timezones.values()
+        ))
+
+
+def load_registry(path=DEFAULT_CONFIG_PATH):
+    """Loads and validates the teams config file."""
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    teams = []
+    for entry in config.get("teams", []):
+        timezones = entry.get("timezones", {})
+        default_timezone = entry.get("default_timezone") or next(iter(timezones), None)
+        if not timezones or default_timezone not in timezones:
+            raise ValueError(f"Team '{entry.get('name')}' needs timezones including its default_timezone")
+        members = [
+            {
+                "name": m["name"],
+                "userUri": m.get("userUri", ""),
+                "soloEventUri": m.get("soloEventUri", ""),
+                "languages": m.get("languages", []),
+                "team": entry["name"],
+                "active": m.get("active", True),
+            }
+            for m in entry.get("members", [])
+        ]
+        teams.append(Team(
+            name=entry["name"],
+            title=entry.get("title", f"{entry['name']} Availability"),
+            languages=entry.get("languages") or sorted({lang for m in members for lang in m["languages"]}),
+            timezones=timezones,
+            default_timezone=default_timezone,
+            members=members,
+        ))
+    if not teams:
+        raise ValueError(f"No teams configured in {path}")
+    return TeamRegistry(teams)
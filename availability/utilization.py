@@ -0,0 +1,160 @@
+"""
+Interval utilization engine.
+
+Per specialist, booked intervals and available slot start times are kept as
+sorted int64 epoch-second arrays: merged booked intervals with prefix sums of
+their durations, raw event starts and ends, and binary-lifting jump tables over
+the greedy non-overlapping slot chain. Booked-time, free-slot, booked-count,
+overlap and utilization queries over any [start, end) range then take
+O(log n) each, vectorized over many ranges (e.g. every working day) at once.
+"""
+from datetime import datetime, time, timedelta
+
+import numpy as np
+
+from availability.aggregation import table_arrays, to_epoch_seconds
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def local_day_bounds(timezone, days):
+    """[start, end) UTC epoch seconds of each local calendar day (DST-aware)."""
+    starts = [timezone.localize(datetime.combine(day, time.min)) for day in days]
+    ends = [timezone.localize(datetime.combine(day + timedelta(days=1), time.min)) for day in days]
+    return to_epoch_seconds(starts), to_epoch_seconds(ends)
+
+
+class SpecialistIntervals:
+    """One specialist's booked intervals and available slot starts (epoch seconds) as sorted arrays."""
+
+    def __init__(self, starts, ends, is_long, slots, slot_duration_seconds):
+        # Raw events, for counts and overlap queries
+        self.event_starts = np.sort(starts)
+        self.event_ends = np.sort(ends)
+        self.long_starts = np.sort(starts[is_long])
+
+        # Merged (non-overlapping) intervals with prefix sums, for booked time
+        order = np.argsort(starts, kind="stable")
+        starts, ends = starts[order], ends[order]
+        running_end = np.maximum.accumulate(ends) if len(ends) else ends
+        new_run = np.r_[True, starts[1:] > running_end[:-1]] if len(starts) else np.empty(0, dtype=bool)
+        run_ids = np.cumsum(new_run) - 1
+        self.merged_starts = starts[new_run]
+        self.merged_ends = np.zeros(len(self.merged_starts), dtype=np.int64)
+        np.maximum.at(self.merged_ends, run_ids, ends)
+        self.booked_prefix = np.r_[0, np.cumsum(self.merged_ends - self.merged_starts)]
+
+        # Available slot starts and the greedy chain: each slot's successor is the
+        # first slot starting at least one slot duration later
+        self.slots = np.unique(slots)
+        n = len(self.slots)
+        successors = np.searchsorted(self.slots, self.slots + slot_duration_seconds, side="left")
+        self.jumps = [successors]
+        while (1 << len(self.jumps)) <= n:
+            previous = self.jumps[-1]
+            self.jumps.append(np.append(previous, n)[previous])
+
+    def _booked_before(self, t):
+        """Booked seconds in (-inf, t) for each t."""
+        # Intervals ending by t count in full; only the next one can be partly before t
+        k = np.searchsorted(self.merged_ends, t, side="right")
+        m = len(self.merged_starts)
+        partial = np.clip(t - self.merged_starts[np.minimum(k, m - 1)], 0, None)
+        return self.booked_prefix[k] + np.where(k < m, partial, 0)
+
+    def booked_seconds(self, starts, ends):
+        """Booked (merged) seconds inside each [start, end)."""
+        starts, ends = np.asarray(starts, dtype=np.int64), np.asarray(ends, dtype=np.int64)
+        if not len(self.merged_starts):
+            return np.zeros(len(starts), dtype=np.int64)
+        return self._booked_before(ends) - self._booked_before(starts)
+
+    def overlapping_events(self, starts, ends):
+        """Number of booked events overlapping each [start, end)."""
+        starts, ends = np.asarray(starts, dtype=np.int64), np.asarray(ends, dtype=np.int64)
+        begun = np.searchsorted(self.event_starts, ends, side="left")
+        finished = np.searchsorted(self.event_ends, starts, side="right")
+        return begun - finished
+
+    def long_event_count(self, starts, ends):
+        """Number of long (60+ minute) events starting in each [start, end)."""
+        return (np.searchsorted(self.long_starts, ends, side="left")
+                - np.searchsorted(self.long_starts, starts, side="left"))
+
+    def available_count(self, starts, ends):
+        """Number of available slot starts in each [start, end)."""
+        return np.searchsorted(self.slots, ends, side="left") - np.searchsorted(self.slots, starts, side="left")
+
+    def free_slots(self, starts, ends):
+        """Greedy non-overlapping (true) slot count among the slots starting in each [start, end)."""
+        starts, ends = np.asarray(starts, dtype=np.int64), np.asarray(ends, dtype=np.int64)
+        current = np.searchsorted(self.slots, starts, side="left")
+        limit = np.searchsorted(self.slots, ends, side="left")
+        counts = (current < limit).astype(np.int64)
+        n = len(self.slots)
+        for level in range(len(self.jumps) - 1, -1, -1):
+            if not n:
+                break
+            step = np.append(self.jumps[level], n)[current]
+            advance = step < limit
+            current = np.where(advance, step, current)
+            counts += advance.astype(np.int64) << level
+        return counts
+
+
+class UtilizationIndex:
+    """SpecialistIntervals for every specialist, plus team-level aggregates."""
+
+    def __init__(self, booked_by_specialist, available_by_specialist, slot_duration_minutes):
+        """
+        `booked_by_specialist`: {name: [(start, end, is_long)]} of tz-aware datetimes,
+        converted to epochs in one pass; `available_by_specialist`: a SlotTable.
+        """
+        self.slot_duration_seconds = slot_duration_minutes * 60
+        names = sorted(set(booked_by_specialist) | set(available_by_specialist.names))
+        events = {
+            name: [(start, end, long) for start, end, long in booked_by_specialist.get(name, []) if end is not None and end > start]
+            for name in names
+        }
+        event_counts = [len(events[name]) for name in names]
+        starts = np.split(to_epoch_seconds([e[0] for name in names for e in events[name]]), np.cumsum(event_counts)[:-1])
+        ends = np.split(to_epoch_seconds([e[1] for name in names for e in events[name]]), np.cumsum(event_counts)[:-1])
+        _, table_epochs = table_arrays(available_by_specialist)
+        table_slots = dict(zip(available_by_specialist.names, np.split(table_epochs, available_by_specialist.offsets[1:-1])))
+        slots = [table_slots.get(name, _EMPTY) for name in names]
+        self.specialists = {
+            name: SpecialistIntervals(
+                starts[i], ends[i], np.array([e[2] for e in events[name]], dtype=bool), slots[i], self.slot_duration_seconds
+            )
+            for i, name in enumerate(names)
+        }
+        self._empty = SpecialistIntervals(_EMPTY, _EMPTY, np.empty(0, dtype=bool), _EMPTY, self.slot_duration_seconds)
+
+    def _get(self, name):
+        return self.specialists.get(name, self._empty)
+
+    def free_slots(self, name, starts, ends):
+        return self._get(name).free_slots(starts, ends)
+
+    def free_seconds(self, name, starts, ends):
+        return self.free_slots(name, starts, ends) * self.slot_duration_seconds
+
+    def booked_seconds(self, name, starts, ends):
+        return self._get(name).booked_seconds(starts, ends)
+
+    def available_count(self, name, starts, ends):
+        return self._get(name).available_count(starts, ends)
+
+    def overlapping_events(self, name, starts, ends):
+        return self._get(name).overlapping_events(starts, ends)
+
+    def long_event_count(self, name, starts, ends):
+        return self._get(name).long_event_count(starts, ends)
+
+    def utilization(self, names, starts, ends):
+        """Booked / (booked + free) time across `names` for each [start, end); NaN where both are zero."""
+        booked = sum(self.booked_seconds(name, starts, ends) for name in names)
+        free = sum(self.free_seconds(name, starts, ends) for name in names)
+        capacity = np.asarray(booked + free, dtype=float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(capacity > 0, booked / capacity, np.nan)
@@ -0,0 +1,164 @@
+"""
+Calendly webhook receiver.
+
+A small threaded HTTP server that accepts Calendly invitee.created and
+invitee.canceled deliveries, verifies their signature and hands the scheduled
+event to a callback on one worker thread. That way a booking or cancellation
+patches the cached snapshot within seconds instead of waiting for the next
+full refresh. Deliveries are acknowledged before they are processed, so a slow
+patch never makes Calendly retry. Without a signing key every delivery is
+rejected. The server binds to CALENDLY_WEBHOOK_HOST, localhost by default so
+it is only reachable through a reverse proxy unless configured otherwise.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from availability.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+HANDLED_EVENTS = ("invitee.created", "invitee.canceled")
+SIGNATURE_TOLERANCE_SECONDS = 180
+MAX_BODY_BYTES = 1024 * 1024
+READ_TIMEOUT_SECONDS = 10 # A client that stalls mid-body gives its handler thread back after this
+WEBHOOK_PORT = os.environ.get("CALENDLY_WEBHOOK_PORT")
+WEBHOOK_HOST = os.environ.get("CALENDLY_WEBHOOK_HOST", "127.0.0.1")
+
+
+def verify_signature(header, body, signing_key, now=None, tolerance_seconds=SIGNATURE_TOLERANCE_SECONDS):
+    """Checks a Calendly-Webhook-Signature header ("t=<unix ts>,v1=<hex hmac>") against the raw body."""
+    parts = dict(part.split("=", 1) for part in (header or "").split(",") if "=" in part)
+    timestamp, signature = parts.get("t"), parts.get("v1")
+    if not timestamp or not signature or not timestamp.isdigit():
+        return False
+    expected = hmac.new(signing_key.encode("utf-8"), timestamp.encode("utf-8") + b"." + body, hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(expected, signature):
+        return False
+    return abs((now or time.time()) - int(timestamp)) <= tolerance_seconds
+
+
+def parse_delivery(body):
+    """
+    Returns (event name, scheduled event) for a handled delivery, or None. For an
+    invitee.canceled delivery without an explicit event status, the scheduled
+    event is marked canceled (one-on-one events end with their invitee).
+    """
+    try:
+        delivery = json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(delivery, dict):
+        return None
+    name = delivery.get("event")
+    scheduled_event = (delivery.get("payload") or {}).get("scheduled_event")
+    if name not in HANDLED_EVENTS or not isinstance(scheduled_event, dict) or not scheduled_event.get("uri"):
+        return None
+    scheduled_event = dict(scheduled_event)
+    if name == "invitee.canceled":
+        scheduled_event.setdefault("status", "canceled")
+    return name, scheduled_event
+
+
+class WebhookServer:
+    """
+    Threaded HTTP server passing each handled, signed delivery to
+    `on_event(name, scheduled_event)`. Every delivery gets a 401 if `signing_key` is empty.
+    """
+
+    def __init__(self, on_event, signing_key=None, host=WEBHOOK_HOST, port=0):
+        self.on_event = on_event
+        self.signing_key = signing_key
+        self._httpd = ThreadingHTTPServer((host, int(port)), self._handler_class())
+        self._httpd.daemon_threads = True
+        # One worker applies deliveries in arrival order
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="webhook")
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._httpd.server_port
+
+    def start(self):
+        """Starts serving in a daemon thread (idempotent)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever, name="webhook-server", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._worker.shutdown(wait=True)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            timeout = READ_TIMEOUT_SECONDS
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                server._handle(self)
+
+        return Handler
+
+    # --- Request handling ---
+
+    def _handle(self, handler):
+        # Validated before reading: rfile.read(-1) would block until the client disconnects
+        header = handler.headers.get("Content-Length")
+        if header is None:
+            return self._reject(handler, 411)
+        if not header.strip().isdigit():
+            return self._reject(handler, 400)
+        length = int(header)
+        if length > MAX_BODY_BYTES:
+            return self._reject(handler, 413)
+        try:
+            body = handler.rfile.read(length)
+        except OSError:
+            # Stalled past READ_TIMEOUT_SECONDS (socket.timeout) or disconnected; nothing to answer
+            handler.close_connection = True
+            return None
+        if not self.signing_key or not verify_signature(
+            handler.headers.get("Calendly-Webhook-Signature"), body, self.signing_key
+        ):
+            METRICS.record_event("webhook.rejected")
+            return self._send(handler, 401)
+        parsed = parse_delivery(body)
+        if parsed is None:
+            METRICS.record_event("webhook.ignored")
+            return self._send(handler, 200)
+        METRICS.record_event(f"webhook.{parsed[0]}")
+        self._worker.submit(self._apply, *parsed)
+        return self._send(handler, 202)
+
+    def _apply(self, name, scheduled_event):
+        try:
+            with METRICS.timer(f"webhook.{name}"):
+                self.on_event(name, scheduled_event)
+        except Exception:
+            # The next full refresh still picks the change up
+            logger.exception("Failed to apply %s for %s", name, scheduled_event.get("uri"))
+
+    def _reject(self, handler, status):
+        # The unread body would be parsed as the next request, so close the connection
+        METRICS.record_event("webhook.rejected")
+        handler.close_connection = True
+        return self._send(handler, status)
+
+    @staticmethod
+    def _send(handler, status):
+        handler.send_response(status)
+        handler.send_header("Content-Length", "0")
+        handler.end_headers()
@@ -0,0 +1 @@
+"""Offline benchmarks for the availability app, run against a local Calendly stand-in."""
@@ -0,0 +1,279 @@
+"""
+Availability app benchmark.
+
+Starts a local Calendly stand-in (benchmarks.fake_calendly) with a synthetic
+organization, runs each fetch/aggregation stage against it and prints a JSON
+report with wall time, request counts (including 429s) and peak memory per
+stage, plus the memory each additional session costs when sessions share one
+snapshot through a SnapshotRegistry versus keeping their own copies. Optionally also loads the Streamlit app end to end via AppTest.
+
+    python -m benchmarks.bench_availability --users 200 --slots 100 \\
+        --event-pages 10 --latency-ms 50 --rate-limit 0.02 --output bench.json
+"""
+import argparse
+import json
+import os
+import pickle
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytz
+
+from benchmarks.fake_calendly import ORGANIZATION_URI, FakeCalendlyServer, FakeOrganization
+
+BENCH_API_KEY = "bench-api-key"
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def run_stage(server, name, fn, measure_memory=True):
+    """Runs one stage and returns (result, metrics)."""
+    server.reset_counters()
+    if measure_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - started
+    peak = None
+    if measure_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    metrics = {
+        "seconds": round(seconds, 4),
+        "requests": dict(server.requests),
+        "requests_total": sum(server.requests.values()),
+        "rate_limited": server.rate_limited,
+        "peak_memory_bytes": peak,
+    }
+    print(f"{name:<32} {seconds:8.3f}s  {metrics['requests_total']:6d} requests", file=sys.stderr)
+    return result, metrics
+
+
+def measure_sessions(open_session, sessions):
+    """
+    Opens `sessions` sessions and returns (sessions, traced bytes each one adds
+    after the first), i.e. the memory cost of one more connected user.
+    """
+    tracemalloc.start()
+    opened = [open_session()]
+    first = tracemalloc.get_traced_memory()[0]
+    opened += [open_session() for _ in range(sessions - 1)]
+    added = tracemalloc.get_traced_memory()[0] - first
+    tracemalloc.stop()
+    return opened, round(added / max(sessions - 1, 1))
+
+
+def run_stages(server, organization, args):
+    # Imported here so CALENDLY_API_BASE is read after it points at the stand-in
+    import requests
+    from availability.core import (
+        SLOT_DURATION_MINUTES, WORKING_DAYS_TO_CHECK, TeamData, fetch_all_scheduled_events, fetch_all_team_availability,
+        get_next_working_days, get_scheduled_events_range, plan_availability_windows,
+    )
+    from availability.discovery import list_organization_memberships, list_solo_event_types, stream_discovery_rows
+    from availability.events import EventSync
+    from availability.metrics import METRICS
+    from availability.scheduler import fetch_event_type_slots
+    from availability.slot_index import SlotIndex
+    from availability.slot_table import SlotTable
+    from availability.slots import list_available_times
+    from availability.snapshots import SnapshotRegistry
+
+    def fetch_window(event_type_uri, window_start, window_end, api_key):
+        try:
+            return list_available_times(event_type_uri, window_start, window_end, api_key)
+        except requests.exceptions.HTTPError:
+            return []
+
+    now = datetime.now(pytz.UTC)
+    timezone = pytz.timezone(args.timezone)
+    windows = plan_availability_windows([timezone], WORKING_DAYS_TO_CHECK, now)
+    scheduled_start, scheduled_end = get_scheduled_events_range([timezone], WORKING_DAYS_TO_CHECK, now)
+    users = organization.users
+    stages = {}
+
+    slots_by_uri, stages["team_availability"] = run_stage(
+        server, "team_availability",
+        lambda: fetch_event_type_slots(fetch_window, [u["event_type_uri"] for u in users], windows, BENCH_API_KEY),
+        args.memory,
+    )
+    stages["team_availability"]["windows"] = len(windows)
+    stages["team_availability"]["slots"] = sum(len(slots) for slots in slots_by_uri.values())
+
+    event_sync = EventSync(ORGANIZATION_URI, BENCH_API_KEY)
+    counts, stages["scheduled_events_full"] = run_stage(
+        server, "scheduled_events_full", lambda: event_sync.sync(scheduled_start, scheduled_end), args.memory
+    )
+    stages["scheduled_events_full"]["events"] = len(event_sync.events)
+    _, stages["scheduled_events_incremental"] = run_stage(
+        server, "scheduled_events_incremental",
+        lambda: event_sync.sync(scheduled_start + timedelta(days=1), scheduled_end + timedelta(days=1)),
+        args.memory,
+    )
+
+    # A small team inside the organization: the fetcher picks per-user queries or the org scan
+    team_uris = [u["uri"] for u in users[:args.team_size]]
+    team_counts, stages["scheduled_events_team"] = run_stage(
+        server, "scheduled_events_team",
+        lambda: fetch_all_scheduled_events(ORGANIZATION_URI, scheduled_start, scheduled_end, BENCH_API_KEY,
+                                           user_uris=team_uris),
+        args.memory,
+    )
+    stages["scheduled_events_team"]["strategy"] = METRICS.snapshot()["last_strategy"]["scheduled_events"]
+    stages["scheduled_events_team"]["team_events"] = sum(team_counts.get(uri, 0) for uri in team_uris)
+
+    def discovery():
+        memberships = list_organization_memberships(ORGANIZATION_URI, BENCH_API_KEY)
+        fetch = lambda user_uri, updated_at, api_key: list_solo_event_types(user_uri, api_key)
+        return [row for _, _, rows in stream_discovery_rows(memberships, fetch, BENCH_API_KEY) for row in rows]
+
+    rows, stages["organization_discovery"] = run_stage(server, "organization_discovery", discovery, args.memory)
+    stages["organization_discovery"]["rows"] = len(rows)
+
+    members = [{"name": u["name"], "languages": ["English"]} for u in users]
+    slot_table = SlotTable.from_datetimes({u["name"]: slots_by_uri[u["event_type_uri"]] for u in users})
+    index, stages["admin_aggregation"] = run_stage(
+        server, "admin_aggregation",
+        lambda: SlotIndex(slot_table, members, timezone, get_next_working_days(WORKING_DAYS_TO_CHECK, timezone),
+                          SLOT_DURATION_MINUTES),
+        args.memory,
+    )
+    stages["admin_aggregation"]["true_slots"] = int(index.day_counts.values.sum())
+    stages["admin_aggregation"]["slot_table_bytes"] = len(pickle.dumps(slot_table))
+
+    # Many sessions showing one snapshot: with the registry each holds a reference, not its own copy
+    snapshot = TeamData(slot_table, {}, {})
+    working_days = get_next_working_days(WORKING_DAYS_TO_CHECK, timezone)
+
+    def build_index(team_data):
+        return SlotIndex(team_data.availability_by_specialist, members, timezone, working_days, SLOT_DURATION_MINUTES)
+
+    def open_shared_session(registry):
+        snapshot_ref = registry.acquire()
+        slot_index = registry.derive(snapshot_ref.version, ("slot_index",), build_index, snapshot_ref.value)
+        return {"snapshot_ref": snapshot_ref, "slot_index": slot_index}
+
+    def open_copied_session(registry):
+        team_data = pickle.loads(pickle.dumps(snapshot))
+        return {"team_data": team_data, "slot_index": build_index(team_data)}
+
+    stages["session_memory"] = {"sessions": args.sessions}
+    for mode, open_session in (("shared", open_shared_session), ("copied", open_copied_session)):
+        registry = SnapshotRegistry(f"bench_{mode}")
+        registry.publish(snapshot)
+        sessions, bytes_per_session = measure_sessions(lambda: open_session(registry), args.sessions)
+        stages["session_memory"][f"{mode}_bytes_per_session"] = bytes_per_session
+        if mode == "shared":
+            # A refresh publishes a new version; once every session has moved on, the old one is evicted
+            registry.publish(TeamData(slot_table, {}, {}))
+            for session in sessions:
+                session["snapshot_ref"].release()
+                session["snapshot_ref"] = registry.acquire()
+            stages["session_memory"]["versions_after_refresh"] = registry.stats()["versions"]
+
+    # Several admins opening a cold dashboard at once: coalescing should leave one set of API calls
+    admin_team = [
+        {"name": u["name"], "userUri": u["uri"], "soloEventUri": u["event_type_uri"], "languages": ["English"]}
+        for u in users[-args.team_size:]
+    ]
+    coalescing_before = METRICS.snapshot()["coalescing"]
+
+    def concurrent_admins():
+        with ThreadPoolExecutor(max_workers=args.admins) as executor:
+            futures = [executor.submit(fetch_all_team_availability, admin_team, BENCH_API_KEY, timezones=[timezone])
+                       for _ in range(args.admins)]
+            return [future.result() for future in futures]
+
+    snapshots, stages["concurrent_admins"] = run_stage(server, "concurrent_admins", concurrent_admins, args.memory)
+    stages["concurrent_admins"]["admins"] = args.admins
+    stages["concurrent_admins"]["identical_results"] = all(
+        (s.booked_event_counts, s.availability_by_specialist.epochs) == (snapshots[0].booked_event_counts, snapshots[0].availability_by_specialist.epochs)
+        for s in snapshots
+    )
+    stages["concurrent_admins"]["coalescing"] = {
+        name: {key: count - coalescing_before.get(name, {}).get(key, 0) for key, count in stats.items()}
+        for name, stats in METRICS.snapshot()["coalescing"].items()
+    }
+    return stages
+
+
+def run_app(server, args):
+    """Loads app.py through Streamlit's AppTest: cold main view, then the admin view."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=600)
+    at.secrets["CALENDLY_API_KEY"] = BENCH_API_KEY
+
+    def load_main():
+        at.run()
+        return at
+
+    def load_admin():
+        at.sidebar.text_input(key="admin_pass").input("WinAsOne")
+        at.sidebar.button[0].click()
+        at.run()
+        return at
+
+    stages = {}
+    _, stages["app_main_view"] = run_stage(server, "app_main_view", load_main, args.memory)
+    _, stages["app_admin_view"] = run_stage(server, "app_admin_view", load_admin, args.memory)
+    stages["app_admin_view"]["exceptions"] = [e.message for e in at.exception]
+    return stages
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50, help="users in the synthetic organization")
+    parser.add_argument("--slots", type=int, default=100, help="available slots per user over the horizon")
+    parser.add_argument("--team-size", type=int, default=4, help="users in the team whose booked events are counted")
+    parser.add_argument("--admins", type=int, default=5, help="simultaneous admins in the coalescing stage")
+    parser.add_argument("--sessions", type=int, default=20, help="sessions sharing one snapshot in the memory stage")
+    parser.add_argument("--event-pages", type=int, default=5, help="pages of 100 scheduled events")
+    parser.add_argument("--latency-ms", type=float, default=20, help="added latency per request")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--timezone", default="Australia/Melbourne")
+    parser.add_argument("--app", action="store_true", help="also load app.py end to end via AppTest")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="skip tracemalloc peak memory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    organization = FakeOrganization(args.users, args.slots, args.event_pages, seed=args.seed)
+    server = FakeCalendlyServer(organization, args.latency_ms, args.rate_limit, seed=args.seed).start()
+    os.environ["CALENDLY_API_BASE"] = server.base_url
+    # Keep the app's snapshot store out of the working tree and cold for every run
+    os.environ["AVAILABILITY_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+
+    started = time.perf_counter()
+    try:
+        stages = run_stages(server, organization, args)
+        if args.app:
+            stages.update(run_app(server, args))
+    finally:
+        server.stop()
+
+    report = {
+        "benchmark": "availability",
+        "timestamp": datetime.now(pytz.UTC).isoformat(),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "total_seconds": round(time.perf_counter() - started, 4),
+        "stages": stages,
+    }
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Local Calendly stand-in for benchmarks.
+
+Serves a synthetic organization with N users, M available slots per user and
+P pages of scheduled events, with configurable per-request latency and a
+configurable share of 429 responses. Any event type URI is answered, so the
+members configured in teams.json work too. Counts every request it serves.
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytz
+
+CALENDLY_URI = "https://api.calendly.com"
+ORGANIZATION_URI = f"{CALENDLY_URI}/organizations/BENCHORG"
+EVENTS_PAGE_SIZE = 100
+HORIZON_DAYS = 14
+
+
+def iso_z(dt):
+    return dt.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def parse_iso(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+class FakeOrganization:
+    """Deterministic synthetic organization data."""
+
+    def __init__(self, users=50, slots_per_user=100, event_pages=5, seed=0):
+        self.users = [
+            {"name": f"User {i:04d}", "email": f"user{i}@example.com",
+             "uri": f"{CALENDLY_URI}/users/BENCHUSER{i:04d}",
+             "event_type_uri": f"{CALENDLY_URI}/event_types/BENCHET{i:04d}"}
+            for i in range(users)
+        ]
+        self.slots_per_user = slots_per_user
+        self.epoch = datetime.now(pytz.UTC).replace(minute=0, second=0, microsecond=0)
+        rng = random.Random(seed)
+        user_uris = [u["uri"] for u in self.users] or [f"{CALENDLY_URI}/users/NOBODY"]
+        self.events = []
+        for i in range(event_pages * EVENTS_PAGE_SIZE):
+            start = self.epoch + timedelta(minutes=30 * rng.randrange(HORIZON_DAYS * 48))
+            self.events.append({
+                "uri": f"{CALENDLY_URI}/scheduled_events/BENCHEV{i:06d}",
+                "status": "active",
+                "start_time": iso_z(start),
+                "end_time": iso_z(start + timedelta(minutes=rng.choice([30, 60, 90]))),
+                "event_memberships": [{"user": rng.choice(user_uris)}],
+                "_start": start,
+            })
+        self.events.sort(key=lambda e: e["_start"])
+
+    def slots_for(self, event_type_uri):
+        """M slot start times on the half hour, spread over the horizon, seeded by the URI."""
+        seed = int(hashlib.sha256(event_type_uri.encode()).hexdigest()[:8], 16)
+        rng = random.Random(seed)
+        offsets = sorted(rng.sample(range(HORIZON_DAYS * 48), min(self.slots_per_user, HORIZON_DAYS * 48)))
+        return [self.epoch + timedelta(minutes=30 * offset) for offset in offsets]
+
+
+class FakeCalendlyServer:
+    """Threaded HTTP server implementing the Calendly endpoints the app uses."""
+
+    def __init__(self, organization, latency_ms=0, rate_limit_ratio=0.0, retry_after_seconds=0.05, seed=0):
+        self.organization = organization
+        self.latency_ms = latency_ms
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after_seconds = retry_after_seconds
+        self.requests = Counter()
+        self.rate_limited = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._httpd.server_port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests.clear()
+            self.rate_limited = 0
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server._handle(self)
+
+        return Handler
+
+    # --- Request handling ---
+
+    def _handle(self, handler):
+        url = urlparse(handler.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        with self._lock:
+            self.requests[url.path] += 1
+            limited = self._rng.random() < self.rate_limit_ratio
+            if limited:
+                self.rate_limited += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if limited:
+            return self._send(handler, 429, {"message": "Rate limit exceeded"},
+                              {"Retry-After": str(self.retry_after_seconds)})
+
+        routes = {
+            "/users/me": self._users_me,
+            "/event_type_available_times": self._available_times,
+            "/scheduled_events": self._scheduled_events,
+            "/organization_memberships": self._memberships,
+            "/event_types": self._event_types,
+        }
+        route = routes.get(url.path)
+        if route is None:
+            return self._send(handler, 404, {"message": "Not found"})
+        self._send(handler, 200, route(query))
+
+    def _send(self, handler, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def _page(self, items, query, path, page_size):
+        page = int(query.get("page", 0))
+        chunk = items[page * page_size:(page + 1) * page_size]
+        next_page = None
+        if (page + 1) * page_size < len(items):
+            next_query = "&".join(f"{k}={v}" for k, v in {**query, "page": page + 1}.items())
+            next_page = f"{self.base_url}{path}?{next_query}"
+        return {"collection": chunk, "pagination": {"next_page": next_page}}
+
+    def _users_me(self, query):
+        return {"resource": {"uri": f"{CALENDLY_URI}/users/ME", "current_organization": ORGANIZATION_URI}}
+
+    def _available_times(self, query):
+        start, end = parse_iso(query["start_time"]), parse_iso(query["end_time"])
+        return {"collection": [
+            {"status": "available", "invitees_remaining": 1, "start_time": iso_z(slot)}
+            for slot in self.organization.slots_for(query["event_type"])
+            if start <= slot < end
+        ]}
+
+    def _scheduled_events(self, query):
+        start = parse_iso(query["min_start_time"]) if "min_start_time" in query else None
+        end = parse_iso(query["max_start_time"]) if "max_start_time" in query else None
+        status = query.get("status", "active")
+        user = query.get("user")
+        events = [
+            {k: v for k, v in event.items() if not k.startswith("_")}
+            for event in self.organization.events
+            if event["status"] == status
+            and (start is None or event["_start"] >= start)
+            and (end is None or event["_start"] < end)
+            and (user is None or event["event_memberships"][0]["user"] == user)
+        ]
+        return self._page(events, query, "/scheduled_events", int(query.get("count", EVENTS_PAGE_SIZE)))
+
+    def _memberships(self, query):
+        memberships = [
+            {"uri": f"{user['uri']}/membership", "updated_at": iso_z(self.organization.epoch),
+             "user": {"name": user["name"], "email": user["email"], "uri": user["uri"]}}
+            for user in self.organization.users
+        ]
+        return self._page(memberships, query, "/organization_memberships", int(query.get("count", 100)))
+
+    def _event_types(self, query):
+        user_uri = query.get("user", "")
+        suffix = user_uri.rsplit("/", 1)[-1]
+        return {"collection": [
+            {"kind": "solo", "name": "Availability Check", "uri": f"{CALENDLY_URI}/event_types/ET{suffix}", "active": True},
+            {"kind": "group", "name": "Team Session", "uri": f"{CALENDLY_URI}/event_types/GT{suffix}", "active": True},
+        ], "pagination": {"next_page": None}}
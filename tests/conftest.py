@@ -0,0 +1,46 @@
+"""
+Shared fixtures: a local fake Calendly (benchmarks.fake_calendly), so no test
+talks to the real API. The availability package reads CALENDLY_API_BASE and
+AVAILABILITY_DB_PATH at import time, so both are set here before any test
+module imports it.
+"""
+import os
+import tempfile
+import uuid
+
+import pytest
+
+from benchmarks.fake_calendly import FakeCalendlyServer, FakeOrganization
+
+_organization = FakeOrganization(users=3, slots_per_user=200, event_pages=1)
+_server = FakeCalendlyServer(_organization).start()
+_db_dir = tempfile.TemporaryDirectory()
+os.environ["CALENDLY_API_BASE"] = _server.base_url
+os.environ["AVAILABILITY_DB_PATH"] = os.path.join(_db_dir.name, "availability.sqlite3")
+
+
+def pytest_unconfigure(config):
+    _server.stop()
+    _db_dir.cleanup()
+
+
+@pytest.fixture
+def fake_calendly():
+    """The running fake Calendly server, with its request counters reset."""
+    _server.reset_counters()
+    return _server
+
+
+@pytest.fixture
+def team_members(fake_calendly):
+    """The fake organization's users as team members."""
+    return [
+        {"name": user["name"], "userUri": user["uri"], "soloEventUri": user["event_type_uri"], "languages": ["English"]}
+        for user in fake_calendly.organization.users
+    ]
+
+
+@pytest.fixture
+def api_key():
+    """A fresh API key, so cached windows and event syncs are never shared between tests."""
+    return f"test-{uuid.uuid4().hex}"
@@ -0,0 +1,123 @@
+import json
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+import requests
+
+from availability import core
+from availability.webhooks import WebhookServer
+from benchmarks.fake_calendly import CALENDLY_URI, iso_z
+from tests.test_webhooks import SIGNING_KEY, post, sign
+
+WORKING_DAYS = 5
+
+
+def booking(host_uri, uri="NEWBOOKING", minutes=90, status="active"):
+    """A scheduled event on the third working day, inside the synced range and past the minimum notice."""
+    day = core.get_next_working_days(3, pytz.UTC)[2]
+    start = pytz.UTC.localize(datetime(day.year, day.month, day.day, 10))
+    return {
+        "uri": f"{CALENDLY_URI}/scheduled_events/{uri}",
+        "start_time": iso_z(start),
+        "end_time": iso_z(start + timedelta(minutes=minutes)),
+        "status": status,
+        "event_memberships": [{"user": host_uri}],
+    }
+
+
+class WindowFetcher:
+    """A fetch_window that bypasses the persisted cache, like the app's webhook refetch, and records its calls."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, solo_event_uri, window_start, window_end, api_key):
+        self.calls.append(solo_event_uri)
+        core.get_availability_window.invalidate(solo_event_uri, window_start, window_end, api_key)
+        return core.get_availability_window(solo_event_uri, window_start, window_end, api_key)
+
+
+@pytest.fixture
+def team_data(team_members, api_key):
+    return core.fetch_all_team_availability(team_members, api_key, working_days=WORKING_DAYS)
+
+
+def apply(team_data, scheduled_event, team_members, api_key, fetch_window=None):
+    return core.apply_booking_change(
+        team_data, scheduled_event, team_members, api_key, fetch_window=fetch_window or WindowFetcher(),
+        working_days=WORKING_DAYS,
+    )
+
+
+def test_booking_updates_only_the_host(team_data, team_members, api_key):
+    host, others = team_members[0], team_members[1:]
+    fetch_window = WindowFetcher()
+
+    patched = apply(team_data, booking(host["userUri"]), team_members, api_key, fetch_window)
+
+    assert patched.booked_event_counts.get(host["name"], 0) == team_data.booked_event_counts.get(host["name"], 0) + 1
+    assert len(patched.booked_events[host["name"]]) == len(team_data.booked_events.get(host["name"], [])) + 1
+    for member in others:
+        assert patched.booked_event_counts.get(member["name"]) == team_data.booked_event_counts.get(member["name"])
+    assert fetch_window.calls and set(fetch_window.calls) == {host["soloEventUri"]}
+    assert not patched.incomplete_specialists
+
+
+def test_short_booking_is_not_counted(team_data, team_members, api_key):
+    host = team_members[0]
+    patched = apply(team_data, booking(host["userUri"], minutes=30), team_members, api_key)
+    assert patched.booked_event_counts.get(host["name"], 0) == team_data.booked_event_counts.get(host["name"], 0)
+    assert len(patched.booked_events[host["name"]]) == len(team_data.booked_events.get(host["name"], [])) + 1
+
+
+def test_cancellation_restores_counts(team_data, team_members, api_key):
+    host = team_members[0]
+    booked = apply(team_data, booking(host["userUri"]), team_members, api_key)
+    canceled = apply(booked, booking(host["userUri"], status="canceled"), team_members, api_key)
+    assert canceled.booked_event_counts == team_data.booked_event_counts
+    assert canceled.booked_events == team_data.booked_events
+
+
+def test_unknown_host_is_ignored(team_data, team_members, api_key):
+    fetch_window = WindowFetcher()
+    patched = apply(team_data, booking(f"{CALENDLY_URI}/users/OUTSIDER"), team_members, api_key, fetch_window)
+    assert patched is team_data
+    assert not fetch_window.calls
+
+
+def test_failed_refetch_keeps_slots_and_flags_host(team_data, team_members, api_key):
+    host = team_members[0]
+
+    def failing_fetch_window(*args):
+        raise requests.exceptions.ConnectionError("Calendly is down")
+
+    patched = apply(team_data, booking(host["userUri"]), team_members, api_key, failing_fetch_window)
+    assert patched.incomplete_specialists == {host["name"]}
+    assert list(patched.availability_by_specialist.datetimes(host["name"])) == list(
+        team_data.availability_by_specialist.datetimes(host["name"])
+    )
+
+
+def test_signed_delivery_patches_team_data(fake_calendly, team_data, team_members, api_key):
+    host = team_members[0]
+    patched, done = [], threading.Event()
+
+    def on_event(name, scheduled_event):
+        patched.append(apply(team_data, scheduled_event, team_members, api_key))
+        done.set()
+
+    server = WebhookServer(on_event, signing_key=SIGNING_KEY, host="127.0.0.1").start()
+    try:
+        fake_calendly.reset_counters()
+        body = json.dumps({"event": "invitee.created", "payload": {"scheduled_event": booking(host["userUri"])}}).encode()
+        assert post(server.port, body, sign(body)) == 202
+        assert done.wait(10)
+    finally:
+        server.stop()
+
+    assert patched[0].booked_event_counts[host["name"]] == team_data.booked_event_counts.get(host["name"], 0) + 1
+    # Only the host's affected windows were fetched again, with no full refresh
+    assert set(fake_calendly.requests) <= {"/event_type_available_times"}
+    assert fake_calendly.requests["/event_type_available_times"] >= 1
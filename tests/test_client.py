@@ -0,0 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from availability.client import CalendlyClient
+
+
+def test_hedge_clock_ignores_rate_limiter_queueing(fake_calendly):
+    # 40 requests at 8/s queue for seconds on the token bucket, but each answers within
+    # 50 ms once sent, so none of them should be hedged
+    fake_calendly.latency_ms = 50
+    try:
+        client = CalendlyClient("hedge-test", burst=8)
+        url = f"{fake_calendly.base_url}/users/me"
+        with ThreadPoolExecutor(max_workers=40) as executor:
+            responses = list(executor.map(lambda _: client.get(url, hedge_after=0.3), range(40)))
+    finally:
+        fake_calendly.latency_ms = 0
+    assert all(response.status_code == 200 for response in responses)
+    assert fake_calendly.requests["/users/me"] == 40
@@ -0,0 +1,29 @@
+import time
+
+from availability import core
+from availability.deadline import Deadline, deadline_scope
+
+
+def test_fetch_shares_one_deadline_across_both_phases(fake_calendly, team_members, api_key):
+    # Every request outlasts the budget, so both phases must stop within it
+    fake_calendly.latency_ms = 3000
+    try:
+        started = time.monotonic()
+        data = core.fetch_all_team_availability(team_members, api_key, deadline_seconds=1, working_days=2)
+        elapsed = time.monotonic() - started
+    finally:
+        fake_calendly.latency_ms = 0
+    assert elapsed < 2
+    assert data.incomplete_specialists == {m["name"] for m in team_members}
+
+
+def test_fetch_uses_the_callers_deadline(fake_calendly, team_members, api_key):
+    fake_calendly.latency_ms = 3000
+    try:
+        started = time.monotonic()
+        with deadline_scope(Deadline(0.5)):
+            core.fetch_all_team_availability(team_members, api_key, deadline_seconds=30, working_days=2)
+        elapsed = time.monotonic() - started
+    finally:
+        fake_calendly.latency_ms = 0
+    assert elapsed < 1.5
@@ -0,0 +1,130 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+from availability import events
+from availability.events import LONG_EVENT_MINUTES, PUSHED_RECONCILE_INTERVAL_SECONDS, EventSync, plan_shards
+from availability.metrics import METRICS
+from benchmarks.fake_calendly import ORGANIZATION_URI, FakeOrganization, parse_iso
+
+REFRESH_INTERVAL_SECONDS = 600 # app.py's snapshot refresh cadence
+
+
+@pytest.fixture
+def canceled_event(fake_calendly):
+    """Cancels one of the fake organization's events on Calendly's side, and restores it afterwards."""
+    event = fake_calendly.organization.events[len(fake_calendly.organization.events) // 2]
+    yield event
+    event["status"] = "active"
+
+
+def test_incremental_sync_drops_canceled_events(fake_calendly, canceled_event, api_key):
+    epoch = fake_calendly.organization.epoch
+    event_sync = EventSync(ORGANIZATION_URI, api_key)
+    start, end = epoch, epoch + timedelta(days=14)
+    event_sync.sync(start, end)
+    assert canceled_event["uri"] in event_sync.events
+
+    canceled_event["status"] = "canceled"
+    fake_calendly.reset_counters()
+    event_sync.sync(start, end)
+
+    assert canceled_event["uri"] not in event_sync.events
+    # Only the canceled scan ran; active events inside the synced range wait for the next reconcile
+    assert fake_calendly.requests["/scheduled_events"] == event_sync.last_sync_requests
+
+
+def test_canceled_scan_skipped_without_held_events(fake_calendly, api_key):
+    past = fake_calendly.organization.epoch - timedelta(days=30)
+    event_sync = EventSync(ORGANIZATION_URI, api_key)
+    event_sync.sync(past, past + timedelta(days=1))
+    fake_calendly.reset_counters()
+    event_sync.sync(past, past + timedelta(days=1))
+    assert fake_calendly.requests["/scheduled_events"] == 0
+
+
+def test_reconcile_picks_up_events_booked_inside_the_synced_range(fake_calendly, api_key):
+    epoch = fake_calendly.organization.epoch
+    start, end = epoch, epoch + timedelta(days=14)
+    event_sync = EventSync(ORGANIZATION_URI, api_key, reconcile_interval_seconds=0)
+    event_sync.sync(start, end)
+    held = len(event_sync.events)
+    event = dict(fake_calendly.organization.events[0], uri="https://api.calendly.com/scheduled_events/LATEBOOKING")
+    fake_calendly.organization.events.append(event)
+    try:
+        event_sync.sync(start, end)
+    finally:
+        fake_calendly.organization.events.remove(event)
+    assert len(event_sync.events) == held + 1
+
+
+def test_refresh_cadence_sync_is_incremental_with_pushed_bookings(fake_calendly, api_key):
+    epoch = fake_calendly.organization.epoch
+    event_sync = EventSync(ORGANIZATION_URI, api_key, reconcile_interval_seconds=PUSHED_RECONCILE_INTERVAL_SECONDS)
+    event_sync.sync(epoch, epoch + timedelta(days=7))
+    reconciled_at, held = event_sync.last_reconcile, dict(event_sync.events)
+
+    # The next refresh starts one refresh interval (plus the fetch itself) after this sync started
+    event_sync.last_reconcile = reconciled_at - timedelta(seconds=REFRESH_INTERVAL_SECONDS + 60)
+    fake_calendly.reset_counters()
+    event_sync.sync(epoch + timedelta(days=1), epoch + timedelta(days=8))
+
+    assert event_sync.last_reconcile == reconciled_at - timedelta(seconds=REFRESH_INTERVAL_SECONDS + 60)
+    # Only the new day and the cancellations were listed, not the whole week again
+    new_day = [e for e in fake_calendly.organization.events if epoch + timedelta(days=7) <= e["_start"] < epoch + timedelta(days=8)]
+    assert {uri for uri in event_sync.events} == (
+        {uri for uri, synced in held.items() if synced.start_time >= epoch + timedelta(days=1)} | {e["uri"] for e in new_day}
+    )
+    assert fake_calendly.requests["/scheduled_events"] == event_sync.last_sync_requests == 2
+
+
+def test_sync_without_pushed_bookings_reconciles_every_refresh(fake_calendly, api_key):
+    epoch = fake_calendly.organization.epoch
+    event_sync = EventSync(ORGANIZATION_URI, api_key)
+    event_sync.sync(epoch, epoch + timedelta(days=7))
+    event_sync.last_reconcile -= timedelta(seconds=REFRESH_INTERVAL_SECONDS + 60)
+    event_sync.sync(epoch + timedelta(days=1), epoch + timedelta(days=8))
+    assert (datetime.now(pytz.UTC) - event_sync.last_reconcile).total_seconds() < 60
+
+
+@pytest.fixture
+def busy_organization(fake_calendly):
+    """Swaps in a 20-page organization, so a multi-day listing is time-sharded."""
+    organization = fake_calendly.organization
+    fake_calendly.organization = FakeOrganization(users=3, event_pages=20, seed=1)
+    yield fake_calendly.organization
+    fake_calendly.organization = organization
+
+
+@pytest.mark.parametrize("days, sharded", [(1, False), (3, True), (14, True)])
+def test_sharded_sync_holds_each_event_once(monkeypatch, busy_organization, api_key, days, sharded):
+    shard_starts = []
+
+    def recording_plan_shards(*args, **kwargs):
+        shards = plan_shards(*args, **kwargs)
+        shard_starts.extend(start for start, _ in shards)
+        return shards
+
+    monkeypatch.setattr(events, "plan_shards", recording_plan_shards)
+    start = busy_organization.epoch
+    end = start + timedelta(days=days)
+    expected = [e for e in busy_organization.events if start <= e["_start"] < end]
+    splits_before = METRICS.snapshot()["events"].get("scheduled_events.shard_split", 0)
+
+    event_sync = EventSync(ORGANIZATION_URI, api_key)
+    event_sync.sync(start, end)
+
+    assert (METRICS.snapshot()["events"].get("scheduled_events.shard_split", 0) > splits_before) == sharded
+    assert set(event_sync.events) == {e["uri"] for e in expected}
+    expected_counts = Counter(
+        e["event_memberships"][0]["user"] for e in expected
+        if e["_start"] + timedelta(minutes=LONG_EVENT_MINUTES) <= parse_iso(e["end_time"])
+    )
+    assert event_sync.counts_by_user() == expected_counts
+    if sharded:
+        # Shards start at the last start time of the page before them, so those events are listed twice
+        on_boundary = [e["uri"] for e in expected if e["_start"] in shard_starts]
+        assert on_boundary
+        assert all(uri in event_sync.events for uri in on_boundary)
@@ -0,0 +1,33 @@
+from datetime import date, datetime, timedelta
+
+import pytz
+
+from availability.reports import build_admin_tables
+from availability.slot_table import SlotTable
+from availability.utilization import UtilizationIndex
+
+MONDAY, TUESDAY = date(2030, 1, 7), date(2030, 1, 8)
+
+
+def at(day, hour, minutes):
+    start = pytz.UTC.localize(datetime(day.year, day.month, day.day, hour))
+    return start, start + timedelta(minutes=minutes), minutes >= 60
+
+
+def test_booked_appointments_cover_only_the_displayed_days():
+    booked = {"Ada": [
+        at(MONDAY, 10, 90),
+        at(TUESDAY, 14, 60),
+        at(TUESDAY, 9, 30),  # Short
+        at(date(2030, 1, 5), 10, 90),  # Saturday before the window
+        at(date(2030, 1, 14), 10, 90),  # Past the displayed days
+    ]}
+    available = SlotTable.from_datetimes({"Ada": [at(MONDAY, 9, 0)[0], at(TUESDAY, 11, 0)[0]]})
+    utilization = UtilizationIndex(booked, available, 30)
+    members = [{"name": "Ada", "languages": ["English"]}]
+
+    tables = build_admin_tables(utilization, members, ["English"], pytz.UTC, [MONDAY, TUESDAY])
+
+    report = tables.report.loc["Ada"]
+    assert report["Booked Appointments (60+ min)"] == 2
+    assert report["Booked Hours"] == 3.0
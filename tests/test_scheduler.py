@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+from availability.core import get_minimum_booking_time, get_working_day_ranges, plan_availability_windows
+from availability.scheduler import QUERY_WINDOW_DAYS, plan_windows
+
+MAX_WINDOW = timedelta(days=QUERY_WINDOW_DAYS)
+STEP = timedelta(minutes=15) # Finer than any UTC offset (e.g. Asia/Kathmandu is +05:45)
+TIMEZONE_SETS = {
+    "utc": ["UTC"],
+    "melbourne": ["Australia/Melbourne"],
+    "mixed": ["Australia/Melbourne", "Asia/Kathmandu", "Asia/Kolkata", "Europe/London", "America/Los_Angeles"],
+}
+
+
+def utc(day, hour=0):
+    return datetime(2030, 1, day, hour, tzinfo=pytz.UTC)
+
+
+def minimum_window_count(ranges):
+    """Fewest windows of at most MAX_WINDOW covering every STEP point of `ranges`: greedy from each uncovered point."""
+    points = sorted({start + STEP * i for start, end in ranges for i in range(int((end - start) / STEP))})
+    count, covered_until = 0, None
+    for point in points:
+        if covered_until is None or point >= covered_until:
+            count, covered_until = count + 1, point + MAX_WINDOW
+    return count
+
+
+def test_plan_windows_splits_at_weekends():
+    # Mon-Fri twice: two windows, each exactly one working week
+    ranges = [(utc(day), utc(day + 1)) for day in (7, 8, 9, 10, 11, 14, 15, 16, 17, 18)]
+    assert plan_windows(ranges) == [(utc(7), utc(12)), (utc(14), utc(19))]
+
+
+def test_plan_windows_splits_long_ranges():
+    assert plan_windows([(utc(1), utc(16))]) == [(utc(1), utc(8)), (utc(8), utc(15)), (utc(15), utc(16))]
+
+
+def test_plan_windows_without_ranges():
+    assert plan_windows([]) == []
+    assert plan_windows([(utc(2), utc(2))]) == []
+
+
+@pytest.mark.parametrize("timezone_set", sorted(TIMEZONE_SETS))
+@pytest.mark.parametrize("working_days", [3, 10])
+def test_planned_windows_cover_every_displayed_slot_minimally(timezone_set, working_days):
+    timezones = [pytz.timezone(name) for name in TIMEZONE_SETS[timezone_set]]
+    # Every hour of a week, off the hour, so the cut-off lands everywhere in the day
+    for hour in range(7 * 24):
+        now = datetime(2026, 10, 19, tzinfo=pytz.UTC) + timedelta(hours=hour, minutes=37)
+        windows = plan_availability_windows(timezones, working_days, now)
+        cutoff = get_minimum_booking_time(now)
+        displayed = [(max(start, cutoff), end) for start, end in get_working_day_ranges(timezones, working_days, now)]
+        displayed = [(start, end) for start, end in displayed if start < end]
+
+        assert all(window_end - window_start <= MAX_WINDOW for window_start, window_end in windows)
+        for start, end in displayed:
+            # Slots start on the half hour; every one after the cut-off must be fetched
+            slot = start + (-start.minute % 30) * timedelta(minutes=1)
+            while slot < end:
+                assert any(window_start <= slot < window_end for window_start, window_end in windows), (now, slot, windows)
+                slot += timedelta(minutes=30)
+        assert len(windows) == minimum_window_count(displayed), (now, windows)
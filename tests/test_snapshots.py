@@ -0,0 +1,28 @@
+from availability.snapshots import SnapshotRegistry
+
+
+def test_acquire_or_publish_publishes_when_nothing_newer():
+    registry = SnapshotRegistry("test")
+    ref = registry.acquire_or_publish("report", registry.latest_version)
+    assert (ref.version, ref.value) == (1, "report")
+    assert registry.stats()["references"] == 1
+
+
+def test_acquire_or_publish_shares_a_concurrent_publish():
+    registry = SnapshotRegistry("test")
+    seen_version = registry.latest_version
+    first = registry.acquire_or_publish("first scan", seen_version)
+    # A second session that started before the first one published gets that version
+    second = registry.acquire_or_publish("second scan", seen_version)
+    assert second.version == first.version and second.value == "first scan"
+    assert registry.stats() == {"latest_version": 1, "versions": 1, "references": 2, "derived": 0}
+
+
+def test_released_old_version_is_evicted():
+    registry = SnapshotRegistry("test")
+    old = registry.acquire_or_publish("old", None)
+    registry.publish("new")
+    assert registry.stats()["versions"] == 2
+    old.release()
+    assert registry.stats()["versions"] == 1
+    assert registry.latest() == "new"
@@ -0,0 +1,194 @@
+import hashlib
+import hmac
+import json
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from availability import webhooks
+from availability.webhooks import MAX_BODY_BYTES, WebhookServer, parse_delivery, verify_signature
+
+SIGNING_KEY = "test-signing-key"
+SCHEDULED_EVENT = {
+    "uri": "https://api.calendly.com/scheduled_events/TEST1",
+    "start_time": "2030-01-07T10:00:00.000000Z",
+    "end_time": "2030-01-07T11:30:00.000000Z",
+    "status": "active",
+    "event_memberships": [{"user": "https://api.calendly.com/users/TEST"}],
+}
+
+
+def sign(body, key=SIGNING_KEY, timestamp=None):
+    timestamp = str(int(time.time() if timestamp is None else timestamp))
+    signature = hmac.new(key.encode("utf-8"), timestamp.encode("utf-8") + b"." + body, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def delivery(name, scheduled_event=SCHEDULED_EVENT):
+    return json.dumps({"event": name, "payload": {"scheduled_event": scheduled_event}}).encode("utf-8")
+
+
+def post(port, body, signature=None):
+    """Sends one delivery like Calendly would and returns the response status."""
+    headers = {"Content-Type": "application/json"}
+    if signature is not None:
+        headers["Calendly-Webhook-Signature"] = signature
+    request = urllib.request.Request(f"http://127.0.0.1:{port}/", data=body, headers=headers, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+class Receiver:
+    """Collects the deliveries a WebhookServer hands to its callback."""
+
+    def __init__(self):
+        self.events = []
+        self.received = threading.Event()
+
+    def __call__(self, name, scheduled_event):
+        self.events.append((name, scheduled_event))
+        self.received.set()
+
+
+@pytest.fixture
+def receiver():
+    return Receiver()
+
+
+@pytest.fixture
+def server(receiver):
+    server = WebhookServer(receiver, signing_key=SIGNING_KEY, host="127.0.0.1").start()
+    yield server
+    server.stop()
+
+
+# --- verify_signature ---
+
+def test_verify_signature_accepts_signed_body():
+    body = delivery("invitee.created")
+    assert verify_signature(sign(body), body, SIGNING_KEY)
+
+
+@pytest.mark.parametrize("header", [
+    None,
+    "",
+    "v1=deadbeef",
+    "t=notanumber,v1=deadbeef",
+    sign(b"other body"),
+    sign(delivery("invitee.created"), key="wrong-key"),
+])
+def test_verify_signature_rejects_bad_headers(header):
+    assert not verify_signature(header, delivery("invitee.created"), SIGNING_KEY)
+
+
+def test_verify_signature_rejects_stale_timestamp():
+    body = delivery("invitee.created")
+    header = sign(body, timestamp=time.time() - 3600)
+    assert not verify_signature(header, body, SIGNING_KEY)
+    assert verify_signature(header, body, SIGNING_KEY, tolerance_seconds=7200)
+
+
+# --- parse_delivery ---
+
+def test_parse_delivery_created():
+    assert parse_delivery(delivery("invitee.created")) == ("invitee.created", SCHEDULED_EVENT)
+
+
+def test_parse_delivery_canceled_defaults_status():
+    scheduled_event = {k: v for k, v in SCHEDULED_EVENT.items() if k != "status"}
+    assert parse_delivery(delivery("invitee.canceled", scheduled_event)) == (
+        "invitee.canceled", {**scheduled_event, "status": "canceled"}
+    )
+
+
+@pytest.mark.parametrize("body", [
+    b"not json",
+    b"[]",
+    delivery("routing_form_submission.created"),
+    delivery("invitee.created", {"start_time": "2030-01-07T10:00:00.000000Z"}),
+    json.dumps({"event": "invitee.created", "payload": {}}).encode("utf-8"),
+])
+def test_parse_delivery_ignores_unhandled(body):
+    assert parse_delivery(body) is None
+
+
+# --- WebhookServer ---
+
+def test_server_rejects_unsigned_delivery(server, receiver):
+    assert post(server.port, delivery("invitee.created")) == 401
+    assert not receiver.events
+
+
+def test_server_rejects_bad_signature(server, receiver):
+    body = delivery("invitee.created")
+    assert post(server.port, body, sign(body, key="wrong-key")) == 401
+    assert not receiver.events
+
+
+def test_server_without_signing_key_rejects_everything(receiver):
+    server = WebhookServer(receiver, signing_key=None, host="127.0.0.1").start()
+    try:
+        body = delivery("invitee.created")
+        assert post(server.port, body) == 401
+        assert post(server.port, body, sign(body)) == 401
+    finally:
+        server.stop()
+    assert not receiver.events
+
+
+def test_server_acknowledges_ignored_event(server, receiver):
+    body = delivery("routing_form_submission.created")
+    assert post(server.port, body, sign(body)) == 200
+    assert not receiver.events
+
+
+def test_server_accepts_signed_delivery(server, receiver):
+    body = delivery("invitee.created")
+    assert post(server.port, body, sign(body)) == 202
+    assert receiver.received.wait(5)
+    assert receiver.events == [("invitee.created", SCHEDULED_EVENT)]
+
+
+def send_raw(port, head, body=b""):
+    """Sends a hand-written request (so Content-Length can be wrong) and returns the status, or None if closed."""
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as connection:
+        connection.sendall(head + b"\r\n" + body)
+        response = connection.recv(1024)
+    return int(response.split()[1]) if response else None
+
+
+@pytest.mark.parametrize("content_length, status", [
+    (None, 411),
+    (b"-1", 400),
+    (b"abc", 400),
+    (b"", 400),
+    (str(MAX_BODY_BYTES + 1).encode(), 413),
+])
+def test_server_rejects_bad_content_length(server, receiver, content_length, status):
+    head = b"POST / HTTP/1.1\r\nHost: localhost\r\n"
+    if content_length is not None:
+        head += b"Content-Length: " + content_length + b"\r\n"
+    started = time.monotonic()
+    assert send_raw(server.port, head) == status
+    assert time.monotonic() - started < 2
+    assert not receiver.events
+
+
+def test_server_drops_stalled_body(monkeypatch, receiver):
+    monkeypatch.setattr(webhooks, "READ_TIMEOUT_SECONDS", 0.5)
+    server = WebhookServer(receiver, signing_key=SIGNING_KEY, host="127.0.0.1").start()
+    try:
+        head = b"POST / HTTP/1.1\r\nHost: localhost\r\nContent-Length: 100\r\n"
+        started = time.monotonic()
+        assert send_raw(server.port, head, b"{}") is None
+        assert time.monotonic() - started < 3
+    finally:
+        server.stop()
+    assert not receiver.events